@@ -0,0 +1,157 @@
+import numpy as np
+from project import Player, MainScene, SpawnSampler
+
+
+# Actions a policy can pick every step, the same four directions the main scene has keys for
+NOOP, UP, RIGHT, DOWN, LEFT = range(5)
+
+# Movement per direction, indexed by action - 1
+DIRECTION_X = np.array([0.0, 1.0, 0.0, -1.0])
+DIRECTION_Y = np.array([-1.0, 0.0, 1.0, 0.0])
+
+
+# Thousands of games of the main scene held in NumPy arrays and advanced in lockstep, for bots to play.
+# Follows the main scene's rules for movement, the bounds, collecting and the speed up, without the snake's body
+# and without any drawing.
+class BatchEnv:
+    # Size of the player sprite facing up or down, it's swapped facing left or right
+    player_size = (60, 52)
+    collectible_size = 80
+    start = (600, 300)
+    start_speed = 200
+    speed_step = 50
+
+    def __init__(self, games: int, seed: int = None, step_time: float = MainScene.step_time):
+        self.games = games
+        self.step_time = step_time
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(games)
+        self.y = np.zeros(games)
+        self.prev_x = np.zeros(games)
+        self.prev_y = np.zeros(games)
+        self.width = np.zeros(games)
+        self.height = np.zeros(games)
+        self.speed = np.zeros(games)
+        # 0 while standing still, otherwise the action of the direction the player is moving in
+        self.direction = np.zeros(games, np.int8)
+        self.collectible_x = np.zeros(games)
+        self.collectible_y = np.zeros(games)
+        self.score = np.zeros(games, np.int64)
+        self.steps = np.zeros(games, np.int64)
+
+        # Score and survived steps of the last finished game in every slot, -1 until one finished
+        self.final_score = np.full(games, -1, np.int64)
+        self.final_steps = np.full(games, -1, np.int64)
+        self.episodes = 0
+
+        self.reset()
+
+    # Start over the games in mask, or all of them
+    def reset(self, mask: np.ndarray = None):
+        index = np.arange(self.games) if mask is None else np.flatnonzero(mask)
+        self.x[index] = self.prev_x[index] = self.start[0]
+        self.y[index] = self.prev_y[index] = self.start[1]
+        self.width[index], self.height[index] = self.player_size
+        self.speed[index] = self.start_speed
+        self.direction[index] = NOOP
+        self.score[index] = 0
+        self.steps[index] = 0
+        self.randomize_collectibles(index)
+
+    # Same spawn area as SpawnSampler, and just like it never within its exclusion gap around the player. Games whose
+    # collectible landed too close simply draw again.
+    def randomize_collectibles(self, index: np.ndarray):
+        area, gap, size = SpawnSampler.area, SpawnSampler.exclusion, self.collectible_size
+        while len(index):
+            x = self.rng.integers(area.left, area.right, len(index))
+            y = self.rng.integers(area.top, area.bottom, len(index))
+            self.collectible_x[index] = x
+            self.collectible_y[index] = y
+            near = ((x < self.x[index] + self.width[index] + gap) & (x + size > self.x[index] - gap) &
+                    (y < self.y[index] + self.height[index] + gap) & (y + size > self.y[index] - gap))
+            index = index[near]
+
+    # Advance every game by one simulation step. Returns which games collected something and which died, the
+    # games that died are started over right away with their result kept in final_score and final_steps.
+    def step(self, actions: np.ndarray):
+        self.turn(actions)
+
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        moving = self.direction != NOOP
+        distance = np.where(moving, self.speed * self.step_time, 0.0)
+        heading = np.maximum(self.direction - 1, 0)
+        self.x += DIRECTION_X[heading] * distance
+        self.y += DIRECTION_Y[heading] * distance
+        self.steps += 1
+
+        # Like Player.sweep and Player.exit_time: a collectible only counts if it was touched before leaving
+        # the bounds. The main scene doesn't look for hits while the player stands still either.
+        exit_time = self.exit_time()
+        hit = self.sweep()
+        collected = (hit <= exit_time) & moving
+        died = ((self.x < Player.min_x) | (self.x > Player.max_x) |
+                (self.y < Player.min_y) | (self.y > Player.max_y))
+
+        collected_index = np.flatnonzero(collected)
+        self.score[collected_index] += 1
+        self.speed[collected_index] += self.speed_step
+        self.randomize_collectibles(collected_index)
+
+        if died.any():
+            self.final_score[died] = self.score[died]
+            self.final_steps[died] = self.steps[died]
+            self.episodes += int(np.count_nonzero(died))
+            self.reset(died)
+        return collected, died
+
+    # Pressing a direction, just like MainScene.handle_command and Player.set_angle
+    def turn(self, actions: np.ndarray):
+        pressed = actions != NOOP
+        if not pressed.any():
+            return
+        horizontal = (actions == LEFT) | (actions == RIGHT)
+        width = np.where(pressed, np.where(horizontal, self.player_size[1], self.player_size[0]), self.width)
+        height = np.where(pressed, np.where(horizontal, self.player_size[0], self.player_size[1]), self.height)
+
+        # Rotated sprites keep the player centered on the same spot
+        dx = (self.width - width) / 2
+        dy = (self.height - height) / 2
+        self.x += dx
+        self.y += dy
+        self.prev_x += dx
+        self.prev_y += dy
+        self.width = width
+        self.height = height
+        self.direction = np.where(pressed, actions, self.direction).astype(np.int8)
+
+    # Time of impact with each game's collectible during the last step, inf where it wasn't touched. The same slab
+    # test as swept_collision, for all games at once.
+    def sweep(self) -> np.ndarray:
+        enter = np.zeros(self.games)
+        leave = np.ones(self.games)
+        size = self.collectible_size
+        for start, end, length, low in ((self.prev_x, self.x, self.width, self.collectible_x),
+                                        (self.prev_y, self.y, self.height, self.collectible_y)):
+            delta = end - start
+            still = delta == 0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                first = (low - start - length) / delta
+                last = (low + size - start) / delta
+            overlap = (start < low + size) & (start + length > low)
+            enter = np.maximum(enter, np.where(still, np.where(overlap, 0.0, np.inf), np.minimum(first, last)))
+            leave = np.minimum(leave, np.where(still, np.where(overlap, 1.0, -np.inf), np.maximum(first, last)))
+        return np.where(enter < leave, enter, np.inf)
+
+    # When during the last step each game left the bounds, 1.0 (the whole step) where it stayed inside
+    def exit_time(self) -> np.ndarray:
+        times = np.ones(self.games)
+        for start, end, low, high in ((self.prev_x, self.x, Player.min_x, Player.max_x),
+                                      (self.prev_y, self.y, Player.min_y, Player.max_y)):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                below = np.where(end < low, (start - low) / (start - end), np.inf)
+                above = np.where(end > high, (high - start) / (end - start), np.inf)
+            outside = np.where((start < low) | (start > high), 0.0, np.minimum(below, above))
+            times = np.minimum(times, outside)
+        return times
@@ -0,0 +1,210 @@
+import os, sys, json, time, argparse
+
+# Benchmarks always run without a window or sound device
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+from project import Game, MainScene, Player, Text, Score, convert_image
+
+
+BASELINE_PATH = "bench_baseline.json"
+
+
+# Times a function and returns the best average time per call in microseconds
+def measure(function, repeat: int = 7, min_time: float = 0.05) -> float:
+    # Double the number of calls until one round takes long enough to time reliably, this also warms up caches
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1_000_000
+
+
+# Keeps the player bouncing left and right so even very fast players stay on screen
+def bouncing_update(scene: MainScene, speed: int):
+    scene.player.reset(600, 300)
+    scene.player.speed = speed
+    scene.player.moving = True
+    # Park the collectible out of the player's way so every run does the same work
+    scene.collectible.set_position(100, 600)
+
+    def update():
+        scene.player.direction = "left" if scene.player.direction == "right" else "right"
+        # Pretend one 60 FPS frame has passed since the last update
+        scene.previous_time = time.perf_counter() - 1 / 60
+        scene.update()
+    return update
+
+
+def bench_main_update(game: Game, speed: int):
+    game.scene_manager.set_scene("main")
+    scene = game.scenes["main"]
+    scene.reset()
+    return bouncing_update(scene, speed)
+
+
+def bench_main_render(game: Game, speed: int):
+    screen = pygame.display.set_mode((1280, 720))
+    # The headless game loads its sprites without a display, render them in the display format like the real game
+    sprites = {key: convert_image(sprite) for key, sprite in game.sprites.items()}
+    scene = MainScene(game.scene_manager, screen, sprites)
+    game.scene_manager.scenes["main"] = scene
+    game.scene_manager.set_scene("main")
+    update = bouncing_update(scene, speed)
+
+    def render():
+        update()
+        scene.render()
+    return render
+
+
+# Horde mode with the player sweeping back and forth through 5000 enemies. Most frames pick up a few of them, some
+# frames dozens, so this times the entity layer's repaints along with the collisions.
+def bench_horde_pickups(game: Game, collectibles: int = 5000):
+    screen = pygame.display.set_mode((1280, 720))
+    sprites = {key: convert_image(sprite) for key, sprite in game.sprites.items()}
+    scene = MainScene(game.scene_manager, screen, sprites, collectibles, seed=1)
+    game.scene_manager.scenes["main"] = scene
+    game.scene_manager.set_scene("main")
+    player = scene.player
+    player.reset(600, 300)
+    player.moving = True
+    player.direction = "right"
+    scene.render()
+
+    def frame():
+        # Turn around before the walls, and keep the speed and the body from growing so every frame does the same
+        # kind of work
+        if player.x > 1050:
+            player.direction = "left"
+        elif player.x < 150:
+            player.direction = "right"
+        player.speed = 1000
+        scene.body.reset()
+        scene.previous_time = time.perf_counter() - 1 / 60
+        scene.update()
+        scene.render()
+    return frame
+
+
+def bench_set_angle(game: Game):
+    player = Player(600, 300, game.sprites["doom"], game.scene_manager)
+    angles = [0, 90, 180, 270]
+    state = {"turn": 0}
+
+    def turn():
+        state["turn"] += 1
+        player.set_angle(angles[state["turn"] % 4])
+    return turn
+
+
+def bench_text_render(game: Game):
+    surface = pygame.Surface((1280, 720))
+    text = Text(80, 30, "Killing Frenzy!")
+    return lambda: text.render(surface)
+
+
+def bench_score_render(game: Game):
+    surface = pygame.Surface((1280, 720))
+    score = Score(600, 80)
+
+    # A new number every call, the worst case for the text cache
+    def render():
+        score.add_score()
+        score.update()
+        score.render(surface)
+    return render
+
+
+def bench_load_sprites(game: Game):
+    return game.load_sprites
+
+
+def bench_reset_main(game: Game):
+    game.scene_manager.set_scene("main")
+
+    def restart():
+        game.scene_manager.reset_main()
+        game.scene_manager.set_scene("main")
+    return restart
+
+
+# Every benchmark takes the headless game and returns the function to time
+BENCHMARKS = {
+    "main_update_speed_200": lambda game: bench_main_update(game, 200),
+    "main_update_speed_1000": lambda game: bench_main_update(game, 1000),
+    "main_update_speed_5000": lambda game: bench_main_update(game, 5000),
+    "main_render_speed_200": lambda game: bench_main_render(game, 200),
+    "main_render_speed_1000": lambda game: bench_main_render(game, 1000),
+    "main_render_speed_5000": lambda game: bench_main_render(game, 5000),
+    "player_set_angle": bench_set_angle,
+    "text_render": bench_text_render,
+    "score_render": bench_score_render,
+    "load_sprites": bench_load_sprites,
+    "reset_main": bench_reset_main,
+    # Last, it leaves the game with a horde in the main scene
+    "horde_pickups": bench_horde_pickups,
+}
+
+
+def run_benchmarks(names: list = None) -> dict:
+    game = Game(headless=True)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = measure(setup(game))
+    return results
+
+
+# Benchmarks that got slower than threshold times their baseline, with the slowdown factor
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    return {name: results[name] / baseline[name]
+            for name in results
+            if name in baseline and results[name] > baseline[name] * threshold}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths against a stored baseline")
+    parser.add_argument("names", nargs="*", help="only run these benchmarks")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=2.0, help="slowdown factor that counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.names)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    for name, value in results.items():
+        ratio = f"{value / baseline[name]:.2f}x" if name in baseline else "new"
+        print(f"{name:<26}{value:>12.2f} us  {ratio}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, factor in regressions.items():
+        print(f"REGRESSION {name}: {factor:.2f}x slower than baseline")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -111,6 +111,7 @@ class SceneManager:
         self.quit = True
     
     def reset_main(self) -> None:
+        self.scenes["death"].sound_played = False
         new_scene = MainScene(self,
                               self.scenes["main"].screen,
                               self.scenes["main"].sprites,
@@ -276,6 +277,7 @@ class DeathScene(Scene):
 
         self.death_sound = pygame.mixer.Sound("sfx/dead.mp3")
         self.death_sound.set_volume(0.25)
+        self.sound_played = False
 
     def update(self):
         pass
@@ -296,8 +298,11 @@ class DeathScene(Scene):
             elif event.type == pygame.QUIT:
                 self.manager.quit_game()
         
-        pygame.mixer.music.pause()
-        self.death_sound.play()
+        # Only play the death sound once per death instead of on every frame
+        if not self.sound_played:
+            pygame.mixer.music.pause()
+            self.death_sound.play()
+            self.sound_played = True
 
 
 # Game class with all according properties
@@ -349,5 +354,7 @@ class Game:
         return sprites
     
 
-game = Game()
-game.run()
\ No newline at end of file
+# Only start the game when run directly, importing this module has no side effects
+if __name__ == "__main__":
+    game = Game()
+    game.run()
\ No newline at end of file
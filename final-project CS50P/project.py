@@ -1,393 +1,2275 @@
-import pygame, random, time
-
-
-# Entities and their location
-class Collectible:
-    def __init__(self, x: float, y: float, sprite: pygame.Surface):
-        self.x = x
-        self.y = y
-        self.sprite = sprite
-        self.rect = self.sprite.get_rect()
-    
-    # Update entity sprite loaction and state
-    def update(self):
-        pass
-    
-    # Render entity sprite on the screen
-    def render(self, screen: pygame.Surface):
-        screen.blit(self.sprite, (self.x, self.y))
-
-    # Randomize spawn location
-    def randomize_position(self):
-        self.x = random.randint(60, 1220)
-        self.y = random.randint(60, 650)
-        self.rect.x = self.x
-        self.rect.y = self.y
-
-
-
-# Player class with all the attributes
-class Player:
-    def __init__(self, x: float, y: float, sprite: pygame.Surface, scene_manager):
-        self.x = x
-        self.y = y
-        self.sprite = sprite
-        self.speed = 200
-        self.angle = 0
-        self.health = 100
-        self.direction = "up"
-        self.moving = False
-        self.rect = self.sprite.get_rect()
-        self.scene_manager = scene_manager
-
-    # Update player's sprite location and state
-    def update(self, deltatime):
-        if self.moving:
-            self.move(deltatime) 
-        self.rect.x = int(self.x)
-        self.rect.y = int(self.y)
-
-    # Render player's sprite on the screen
-    def render(self, screen: pygame.Surface):
-        screen.blit(self.sprite, (self.x, self.y))
-
-
-    def set_angle(self, new_angle: int) -> None:
-        rotation = new_angle - self.angle
-        self.sprite = pygame.transform.rotate(self.sprite, rotation)
-        self.angle = new_angle
-
-
-    def move(self, deltatime):
-        # Values for directions
-        if self.direction == "up":
-            self.y -= self.speed * deltatime
-        elif self.direction == "down":
-            self.y += self.speed * deltatime
-        elif self.direction == "left":
-            self.x -= self.speed * deltatime
-        elif self.direction == "right":
-            self.x += self.speed * deltatime
-        
-        # Death screen when out of bounds
-        if self.x < 20 or self.x > 1260 or self.y < 20 or self.y > 700:
-            self.scene_manager.set_scene("death")
-        
-# Text class 
-class Text:
-    def __init__(self, x, y, text: str):
-        self.x = x
-        self.y = y
-        self.text = text
-        self.font = pygame.font.SysFont("Arial Black", 36)
-    
-
-    def update(self):
-        pass
-    
-
-    def render(self, screen: pygame.Surface):
-        self.rendered = self.font.render(self.text, True, "white")
-        screen.blit(self.rendered, (self.x, self.y))
-
-# Initializes a score that keeps track of how many sprites have been collected
-class Score:
-    def __init__(self, x, y) -> None:
-        self.font = pygame.font.SysFont("Arial Black", 40)
-        self.score = 0
-        self.text = str(self.score)
-        self.x = x
-        self.y = y
-
-    def add_score(self):
-        self.score += 1
-
-    def update(self):
-        self.text = str(self.score)
-    
-    def render(self, screen: pygame.Surface):
-        screen.blit(self.font.render(self.text, True, "white"), (self.x, self.y))
-
-# Manager of all scenes, includes score mapping
-class SceneManager:
-    def __init__(self):
-        self.scenes = {}
-        self.quit = False
-        self.score = Score(600, 80)  # Initialize score here
-        self.highscore = 0
-
-    def initialize(self, scenes: dict, starting_scene: str):
-        self.scenes = scenes
-        self.current_scene = self.scenes[starting_scene]
-    
-    def set_scene(self, new_scene: str):
-        self.current_scene = self.scenes[new_scene]
-
-    def get_scene(self):
-        return self.current_scene
-    
-    def quit_game(self):
-        self.quit = True
-    
-    def reset_main(self) -> None:
-        self.score.score = 0
-        new_scene = MainScene(self,
-                              self.scenes["main"].screen,
-                              self.scenes["main"].sprites,
-                              )
-        self.scenes["main"] = new_scene
-
-    def get_score(self):
-        return self.score
-
-    def add_score(self):
-        self.score.add_score()
-
-        # Update highscore if current score is higher
-        if self.score.score > self.highscore:
-            self.highscore = self.score.score
-    
-    def get_highscore(self):
-        return self.highscore
-
-
-class Scene:
-    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
-        self.manager = manager 
-        self.screen = screen
-        self.sprites = sprites
-    
-    def update(self):
-        pass
-
-    def render(self):
-        pass
-
-    def poll_events(self):
-        pass
-
-
-# Main scene, main gameplay 
-class MainScene(Scene):
-    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
-        super().__init__(manager, screen, sprites)
-        self.previous_time = None
-        self.player = Player(600, 300, self.sprites["doom"], self.manager)
-        self.collectible = Collectible(200, 200, self.sprites["entity"])
-        self.collectible.randomize_position()
-        self.milestones = {5: "Penta Kill!", 
-                           10: "Killing Frenzy!", 
-                           15: "Murder Spree!",
-                           20: "Killtastrophe!",
-                           25: "Mother of god...",
-                           30: "Nuclear!!!",
-                           40: "George Bush would be proud",
-                           50: "G E N O C I D E",
-                           60: "Genghis Khan reincarnate",
-                           70: "BLACK DEATH",
-                           100: "G O D L I K E"}
-        
-        self.displayed_milestones = set()
-        self.displayed_message = None
-
-        self.keybinds = {
-            pygame.K_w: (0, "up"),
-            pygame.K_UP: (0, "up"),
-            pygame.K_d: (270, "right"),
-            pygame.K_RIGHT: (270, "right"),
-            pygame.K_s: (180, "down"),
-            pygame.K_DOWN: (180, "down"),
-            pygame.K_a: (90, "left"),
-            pygame.K_LEFT: (90, "left")
-        }
-    
-        self.collect_sound = pygame.mixer.Sound("sfx/Die.mp3")
-        self.collect_sound.set_volume(0.5)  
-
-    def update(self):
-        # Compute delta time
-        if self.previous_time is None:
-            self.previous_time = time.time()
-        now = time.time()
-        deltatime = now - self.previous_time
-        self.previous_time = now
-
-        self.player.update(deltatime)
-        self.collectible.update()
-
-        for milestone, message in self.milestones.items():
-            if self.manager.get_score().score >= milestone and milestone not in self.displayed_milestones:
-                self.display_message(message)
-                self.displayed_milestones.add(milestone)
-    
-        # Detect collisions
-        if self.player.rect.colliderect(self.collectible.rect):
-            self.collectible.randomize_position()
-            self.player.speed += 50
-            self.collect_sound.play()
-            self.manager.add_score()
-
-            for milestone, message in self.milestones.items():
-                if self.manager.get_score() == milestone:
-                    self.display_message(message)
-                    self.displayed_milestones.add(milestone)
-        
-        self.manager.get_score().update()
-    
-
-    def display_message(self, message):
-        self.displayed_message = message
-    
-
-    def render(self):
-        self.screen.fill("black")
-        self.screen.blit(self.sprites["background"], (0, 0))
-        self.player.render(self.screen)
-        self.collectible.render(self.screen)
-        self.manager.get_score().render(self.screen)
-
-        if self.displayed_message:
-            message_text = Text(80, 30, self.displayed_message)
-            message_text.render(self.screen)
-
-        pygame.display.update() 
-
-        
-    def poll_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.manager.quit_game()
-            
-            if event.type == pygame.KEYDOWN and event.key in self.keybinds:
-                self.player.set_angle(self.keybinds[event.key][0])
-                self.player.direction = self.keybinds[event.key][1]
-                self.player.moving = True
-            
-            if event.type == pygame.KEYUP and event.key in self.keybinds:
-                if self.keybinds[event.key][1] == self.player.direction:
-                    self.player.moving = True
-    
-    def get_score(self):
-        return self.manager.get_score()
-
-
-# Start scene
-class StartScene(Scene):
-    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
-        super().__init__(manager, screen, sprites)
-        self.font = pygame.font.SysFont("Arial Black", 36)
-        self.text = "Press SPACE to start!"
-        self.text_x = 400
-        self.text_y = 300
-
-    def update(self):
-        pass
-
-    def render(self):
-        self.screen.blit(self.sprites["start-background"], (0, 0))
-        self.screen.blit(self.font.render(self.text, True, "white"), (self.text_x, self.text_y))
-        pygame.display.update()
-
-    def poll_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.manager.quit_game()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    self.manager.set_scene("main")
-
-
-# Scene that plays upon death
-class DeathScene(Scene):
-    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
-        super().__init__(manager, screen, sprites)
-        self.font = pygame.font.SysFont("Arial Black", 36)
-        self.screen.fill("black")
-        self.text1 = "Press R to restart, or Q to exit game."
-        self.text1_x = 300
-        self.text1_y = 500
-        self.text2_x = 550
-        self.text2_y = 100
-
-        
-    def update(self):
-        pass
-
-    def render(self):
-        self.screen.blit(self.sprites["death-background"], (0, 0))
-        self.screen.blit(self.font.render(self.text1, True, "#8B2323"), (self.text1_x, self.text1_y))
-        self.screen.blit(self.font.render(f"Score: {self.manager.get_score().score}", True, "white"), (self.text2_x, self.text2_y))
-        self.screen.blit(self.font.render(f"Highscore: {self.manager.get_highscore()}", True, "white"), (self.text2_x, self.text2_y + 50))
-        pygame.display.update()
-    
-    def poll_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    self.manager.reset_main()
-                    self.manager.set_scene("main")
-                if event.key == pygame.K_q:
-                    self.manager.quit_game()
-            elif event.type == pygame.QUIT:
-                self.manager.quit_game()
-        
-
-# Game class with all according properties
-class Game:
-    # Render screen and initialize game
-    def __init__(self):
-        pygame.init()
-        self.running = True
-        self.screen = pygame.display.set_mode((1280, 720))
-        self.display = pygame.display.set_caption("2D BOOM SNAKE")
-        self.icon = pygame.image.load("sprites/doom-guy.png")
-        pygame.display.set_icon(self.icon)
-        self.sprites = self.load_sprites()
-        self.scene_manager = SceneManager()
-
-        pygame.mixer.music.load("sfx/Eternal.mp3")
-        pygame.mixer.music.set_volume(0.25)
-        pygame.mixer.music.play(-1)
-
-        self.scenes = {
-            "start": StartScene(self.scene_manager, self.screen, self.sprites),
-            "main": MainScene(self.scene_manager, self.screen, self.sprites),
-            "death": DeathScene(self.scene_manager, self.screen, self.sprites)
-        } 
-        self.scene_manager.initialize(self.scenes, "start")
-
-
-    # Run game
-    def run(self):
-        while self.running:
-            self.scene_manager.current_scene.poll_events()
-            self.scene_manager.current_scene.update()
-            self.scene_manager.current_scene.render()
-        
-            if self.scene_manager.quit == True:
-                self.running = False
-
-        pygame.quit()
-
-    # Load sprites
-    def load_sprites(self) -> dict:
-        sprites = {}
-        sprites["doom"] = pygame.image.load("sprites/doom-guy-neutral.png").convert_alpha()
-        sprites["start-background"] = pygame.image.load("sprites/start-background.png").convert_alpha()
-        sprites["background"] = pygame.image.load("sprites/hell.jpg").convert_alpha()
-        sprites["death-background"] = pygame.image.load("sprites/dead.jpg").convert_alpha()
-        sprites["entity"] = pygame.image.load("sprites/enemy.png").convert_alpha()
-
-        # Downscale sprites
-        sprites["doom"] = pygame.transform.scale(sprites["doom"], (60, 52))
-        sprites["entity"] = pygame.transform.scale(sprites["entity"], (80, 80))
-
-        return sprites
-
-
-def main():
-    game = Game()
-    game.run()
-
-if __name__ == "__main__":
+import time
+
+# Taken before pygame is imported, so the startup report can tell how long importing took
+IMPORT_STARTED = time.perf_counter()
+
+import pygame, random, os, sys, struct, hashlib, threading, argparse, csv, json, math, sqlite3, queue, string
+from array import array
+from functools import lru_cache
+
+
+FONT_NAME = "Arial Black"
+
+# SysFont does a system font lookup on every call, so each (name, size) pair is only loaded once
+_fonts = {}
+
+def get_font(name: str, size: int) -> pygame.font.Font:
+    if (name, size) not in _fonts:
+        _fonts[(name, size)] = pygame.font.SysFont(name, size)
+    return _fonts[(name, size)]
+
+
+# Rendered text surfaces, the same string in the same font and color is only rasterized once
+@lru_cache(maxsize=256)
+def render_text(name: str, size: int, text: str, color) -> pygame.Surface:
+    return get_font(name, size).render(text, True, color)
+
+
+# Every character of a charset rasterized once into a single surface. Text made of those characters is put
+# together from subsurfaces of the atlas with one blits call, so numbers that change all the time never go through
+# the font rasterizer.
+class GlyphAtlas:
+    charset = string.digits + string.ascii_letters + " :."
+
+    def __init__(self, name: str, size: int, color, charset: str = None):
+        self.name = name
+        self.size = size
+        self.color = color
+        font = get_font(name, size)
+        rendered = [(char, font.render(char, True, color)) for char in charset or self.charset]
+        self.height = max(glyph.get_height() for _, glyph in rendered)
+        self.surface = pygame.Surface((sum(glyph.get_width() for _, glyph in rendered), self.height), pygame.SRCALPHA)
+
+        # Fonts advance by fractions of a pixel, measuring a long run of the same character gets that fraction right
+        self.glyphs = {}
+        self.advances = {}
+        x = 0
+        for char, glyph in rendered:
+            self.surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.glyphs[char] = self.surface.subsurface((x, 0, glyph.get_width(), self.height))
+            self.advances[char] = font.size(char * 16)[0] / 16
+            x += glyph.get_width()
+
+    # A new surface showing text, characters the atlas doesn't have make it fall back to the font
+    def compose(self, text: str) -> pygame.Surface:
+        try:
+            glyphs = [(self.glyphs[char], self.advances[char]) for char in text]
+        except KeyError:
+            return render_text(self.name, self.size, text, self.color)
+
+        # Glyphs are copied as they are instead of blended onto the empty surface, where two overlap the
+        # brighter pixel wins
+        blits = []
+        x = 0.0
+        for glyph, advance in glyphs:
+            blits.append((glyph, (round(x), 0), None, pygame.BLEND_RGBA_MAX))
+            x += advance
+        width = max(round(x), max((position[0] + glyph.get_width() for glyph, position, _, _ in blits), default=0))
+        surface = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        surface.blits(blits, False)
+        return surface
+
+
+# One atlas per font, size and color
+_atlases = {}
+
+def get_atlas(name: str, size: int, color) -> GlyphAtlas:
+    if (name, size, color) not in _atlases:
+        _atlases[(name, size, color)] = GlyphAtlas(name, size, color)
+    return _atlases[(name, size, color)]
+
+
+# Processed images are kept here so later launches skip decoding and scaling
+ASSET_CACHE_DIR = ".asset-cache"
+
+
+# Every sprite the game uses, with the size it gets scaled to
+SPRITES = {
+    "doom": ("sprites/doom-guy-neutral.png", (60, 52)),
+    "start-background": ("sprites/start-background.png", None),
+    "background": ("sprites/hell.jpg", None),
+    "death-background": ("sprites/dead.jpg", None),
+    "entity": ("sprites/enemy.png", (80, 80)),
+}
+
+# Every sound effect the game uses, with its volume
+SOUNDS = {
+    "collect": ("sfx/Die.mp3", 0.5),
+    "death": ("sfx/dead.mp3", 0.25),
+}
+
+# Angle of the player's sprite for each direction it can move in, the order is also how recordings store them
+DIRECTION_ANGLES = {"up": 0, "right": 270, "down": 180, "left": 90}
+
+# Everything that happens once the score reaches some value: milestone messages, speed changes and spawn waves
+TRIGGERS_PATH = "triggers.json"
+
+
+# Load an image from disk, scaled to size and converted for fast blitting
+def load_image(path: str, size: tuple = None, cache_dir: str = ASSET_CACHE_DIR, convert: bool = True) -> pygame.Surface:
+    with open(path, "rb") as file:
+        key = hashlib.sha1(file.read()).hexdigest()
+    if size:
+        key += f"-{size[0]}x{size[1]}"
+    cache_path = os.path.join(cache_dir, key + ".raw")
+
+    surface = read_cached_image(cache_path)
+    if surface is None:
+        surface = pygame.image.load(path)
+        if size:
+            surface = pygame.transform.scale(surface, size)
+        write_cached_image(cache_path, surface)
+
+    return convert_image(surface) if convert else surface
+
+
+# Convert to the display's pixel format, only done on the main thread
+def convert_image(surface: pygame.Surface) -> pygame.Surface:
+    # Without a display there is no pixel format to convert to (tests and headless runs)
+    if pygame.display.get_surface() is None:
+        return surface
+    if not has_alpha(surface):
+        return surface.convert()
+    # Run-length encoding skips the transparent parts of sprites when blitting, a lot faster for horde mode
+    surface = surface.convert_alpha()
+    surface.set_alpha(255, pygame.RLEACCEL)
+    return surface
+
+
+# Whether any pixel of the surface is actually see-through
+def has_alpha(surface: pygame.Surface) -> bool:
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return False
+    width, height = surface.get_size()
+    return pygame.mask.from_surface(surface, 254).count() < width * height
+
+
+# Cached images are a small header (format, width, height) followed by the raw pixels
+def read_cached_image(path: str):
+    try:
+        with open(path, "rb") as file:
+            fmt, width, height = struct.unpack("<4sII", file.read(12))
+            return pygame.image.fromstring(file.read(), (width, height), fmt.decode().strip())
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def write_cached_image(path: str, surface: pygame.Surface) -> None:
+    fmt = "RGBA" if has_alpha(surface) else "RGB"
+    width, height = surface.get_size()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a half written cache entry
+        with open(path + ".tmp", "wb") as file:
+            file.write(struct.pack("<4sII", fmt.ljust(4).encode(), width, height))
+            file.write(pygame.image.tostring(surface, fmt))
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass
+
+
+# The mixer is the slowest subsystem to bring up and nothing on the start screen needs it, so it only starts once
+# the first sound does. The asset loader's thread can get here at the same time as the main loop.
+_mixer_lock = threading.Lock()
+
+def init_mixer() -> bool:
+    with _mixer_lock:
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error:
+                return False
+        return True
+
+
+# Decoded sounds are shared, so a file is only ever decoded once
+_sounds = {}
+
+def load_sound(path: str, volume: float = 1.0) -> pygame.mixer.Sound:
+    if path not in _sounds:
+        init_mixer()
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+        _sounds[path] = sound
+    return _sounds[path]
+
+
+# Trigger files hold a list of {"score": N, <kind>: <value>, ...}, every kind in an entry fires at the same score.
+# Returns (score, kind, value) tuples and only reads each file once.
+_triggers = {}
+
+def load_triggers(path: str = TRIGGERS_PATH) -> list:
+    if path not in _triggers:
+        with open(path) as file:
+            entries = json.load(file)["triggers"]
+        _triggers[path] = [(entry["score"], kind, value)
+                           for entry in entries for kind, value in entry.items() if kind != "score"]
+    return _triggers[path]
+
+
+# Hands out mixer channels by name so music, effects and stingers never fight over voices
+class AudioManager:
+    # Channel groups and how many reserved channels each one gets
+    groups = {"sfx": 6, "stinger": 1}
+    # Most copies of the same sound allowed to play at once
+    voice_limit = 2
+
+    def __init__(self, muted: bool = False):
+        self.channels = {}
+        self.played = 0
+        self.dropped = 0
+        # A muted manager is the null audio backend, nothing is ever sent to the mixer
+        self.muted = muted
+
+    # Channels can only be reserved once the mixer is up, so this happens on first use
+    def setup(self) -> bool:
+        if self.channels:
+            return True
+        if self.muted or not init_mixer():
+            return False
+        total = sum(self.groups.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), total))
+        pygame.mixer.set_reserved(total)
+        index = 0
+        for group, count in self.groups.items():
+            self.channels[group] = [pygame.mixer.Channel(index + i) for i in range(count)]
+            index += count
+        return True
+
+    # Play a sound on a free channel of the group, returns False when it was dropped
+    def play(self, sound: pygame.mixer.Sound, group: str = "sfx", limit: int = None) -> bool:
+        if not self.setup():
+            return False
+        channels = self.channels[group]
+        free = None
+        voices = 0
+        for channel in channels:
+            if not channel.get_busy():
+                free = free or channel
+            elif channel.get_sound() is sound:
+                voices += 1
+
+        if free is None or voices >= (limit or self.voice_limit):
+            self.dropped += 1
+            return False
+        free.play(sound)
+        self.played += 1
+        return True
+
+    def play_music(self, path: str, volume: float, loops: int = -1):
+        if self.muted or not init_mixer():
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+
+    def pause_music(self):
+        if not self.muted and pygame.mixer.get_init():
+            pygame.mixer.music.pause()
+
+    def resume_music(self):
+        if not self.muted and pygame.mixer.get_init():
+            pygame.mixer.music.unpause()
+
+    # Number of voices currently playing in every group
+    def active_voices(self) -> dict:
+        voices = {group: sum(channel.get_busy() for channel in channels)
+                  for group, channels in self.channels.items()}
+        voices["music"] = int(bool(pygame.mixer.get_init() and pygame.mixer.music.get_busy()))
+        return voices
+
+
+# Decodes sprites and sounds on a worker thread while the start scene is already on screen
+class AssetLoader:
+    def __init__(self, sprites: dict, sounds: dict):
+        self.sprites = sprites
+        self.sounds = sounds
+        self.total = len(sprites) + len(sounds)
+        self.loaded = 0
+        self.decoded = {}
+        self.error = None
+        # Set by the main thread once it brought the mixer up, SDL's audio device isn't opened from the worker
+        self.mixer_ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    # Called on the main thread, the sounds are decoded for the mixer's format so they wait for this
+    def start_mixer(self):
+        init_mixer()
+        self.mixer_ready.set()
+
+    def run(self):
+        try:
+            for key, (path, size) in self.sprites.items():
+                self.decoded[key] = load_image(path, size, convert=False)
+                self.loaded += 1
+            self.mixer_ready.wait()
+            for path, volume in self.sounds.values():
+                # Without an audio device there is nothing to decode for, the game plays silently
+                if pygame.mixer.get_init():
+                    load_sound(path, volume)
+                self.loaded += 1
+        except Exception as error:
+            self.error = error
+
+    @property
+    def progress(self) -> float:
+        return self.loaded / self.total if self.total else 1.0
+
+    @property
+    def done(self) -> bool:
+        return not self.thread.is_alive()
+
+    # Wait for the worker and hand back the sprites converted for the display
+    def finish(self) -> dict:
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return {key: convert_image(surface) for key, surface in self.decoded.items()}
+
+
+# Time of impact (0 to 1) when a box moving by (dx, dy) first overlaps target, None if it never does
+def swept_collision(x: float, y: float, width: float, height: float, dx: float, dy: float, target: pygame.Rect):
+    # The stretch of the step where the boxes overlap, narrowed down by one axis and then the other. Written out
+    # per axis, it runs for every nearby collectible every step.
+    enter, leave = 0.0, 1.0
+    if dx == 0:
+        # Not moving on this axis, so it has to overlap the whole time
+        if x >= target.right or x + width <= target.left:
+            return None
+    else:
+        first, last = (target.left - x - width) / dx, (target.right - x) / dx
+        if first > last:
+            first, last = last, first
+        if first > enter:
+            enter = first
+        if last < leave:
+            leave = last
+        if enter >= leave:
+            return None
+    if dy == 0:
+        if y >= target.bottom or y + height <= target.top:
+            return None
+    else:
+        first, last = (target.top - y - height) / dy, (target.bottom - y) / dy
+        if first > last:
+            first, last = last, first
+        if first > enter:
+            enter = first
+        if last < leave:
+            leave = last
+        if enter >= leave:
+            return None
+    return enter
+
+
+# Where enemies may appear. The spawn area is cut into cells once, the cells that are still allowed sit in an
+# array with each cell's slot in it kept alongside, so sampling is one random index and taking a cell out or putting
+# it back is a swap with the last one. Cells near the player are kept out of the array.
+class SpawnSampler:
+    # Top left corners of enemies stay in here, so the whole sprite is on screen and clear of the deadly edges
+    area = pygame.Rect(60, 60, 1280 - 120 - 80, 720 - 120 - 80)
+    cell = 20
+    # Sprite size, a cell is excluded when an enemy anywhere in it could overlap an excluded rect
+    sprite = 80
+    # Gap kept around the player's rect
+    exclusion = 160
+
+    def __init__(self):
+        self.columns = self.area.width // self.cell
+        self.rows = self.area.height // self.cell
+        total = self.columns * self.rows
+        self.cells = array("H", range(total))
+        self.slots = array("i", range(total))
+        self.count = total
+        self.excluded = (0, -1, 0, -1)
+        # State right after excluding a range from scratch, runs mostly start with the player on the same spot
+        self.starts = {}
+
+    # Every cell allowed again in a fixed order apart from the ones around rect, so runs that start from the same
+    # seed sample the same positions
+    def reset(self, rect: pygame.Rect = None):
+        excluded = (0, -1, 0, -1) if rect is None else self.exclusion_range(rect)
+        if excluded not in self.starts:
+            total = self.columns * self.rows
+            self.cells[:] = array("H", range(total))
+            self.slots[:] = array("i", range(total))
+            self.count = total
+            self.excluded = (0, -1, 0, -1)
+            self.exclude_range(excluded)
+            self.starts[excluded] = (array("H", self.cells), array("i", self.slots), self.count)
+        cells, slots, self.count = self.starts[excluded]
+        self.cells[:] = cells
+        self.slots[:] = slots
+        self.excluded = excluded
+
+    def add(self, cell: int):
+        if self.slots[cell] < 0:
+            self.cells[self.count] = cell
+            self.slots[cell] = self.count
+            self.count += 1
+
+    def remove(self, cell: int):
+        slot = self.slots[cell]
+        if slot >= 0:
+            self.count -= 1
+            last = self.cells[self.count]
+            self.cells[slot] = last
+            self.slots[last] = slot
+            self.slots[cell] = -1
+
+    # Inclusive (first column, last column, first row, last row) of the cells an enemy would overlap rect from
+    def cell_range(self, rect: pygame.Rect, margin: int = 0) -> tuple:
+        x, y, cell, sprite = self.area.x, self.area.y, self.cell, self.sprite
+        return (max((rect.left - margin - sprite - cell + 1 - x) // cell + 1, 0),
+                min(-((x - rect.right - margin) // cell) - 1, self.columns - 1),
+                max((rect.top - margin - sprite - cell + 1 - y) // cell + 1, 0),
+                min(-((y - rect.bottom - margin) // cell) - 1, self.rows - 1))
+
+    # Keep enemies away from rect. Only the cells that came in or dropped out of the excluded range are touched, so
+    # following a moving player costs a strip of cells at most.
+    def exclude(self, rect: pygame.Rect):
+        self.exclude_range(self.exclusion_range(rect))
+
+    def exclusion_range(self, rect: pygame.Rect) -> tuple:
+        return self.cell_range(rect, self.exclusion)
+
+    def exclude_range(self, excluded: tuple):
+        if excluded == self.excluded:
+            return
+        for cell in self.difference(self.excluded, excluded):
+            self.add(cell)
+        for cell in self.difference(excluded, self.excluded):
+            self.remove(cell)
+        self.excluded = excluded
+
+    # Cells in range a that aren't in range b, as at most four strips
+    def difference(self, a: tuple, b: tuple):
+        left, right, top, bottom = a
+        if left > right or top > bottom:
+            return
+        strips = ((left, right, top, min(bottom, b[2] - 1)),
+                  (left, right, max(top, b[3] + 1), bottom),
+                  (left, min(right, b[0] - 1), max(top, b[2]), min(bottom, b[3])),
+                  (max(left, b[1] + 1), right, max(top, b[2]), min(bottom, b[3])))
+        for left, right, top, bottom in strips:
+            for row in range(top, bottom + 1):
+                for column in range(left, right + 1):
+                    yield row * self.columns + column
+
+    # A random spot in a random allowed cell, the returned cell is where it landed
+    def sample_cell(self, rng: random.Random) -> tuple:
+        if self.count:
+            cell = self.cells[rng.randrange(self.count)]
+        else:
+            cell = rng.randrange(self.columns * self.rows)
+        row, column = divmod(cell, self.columns)
+        return (self.area.x + column * self.cell + rng.randrange(self.cell),
+                self.area.y + row * self.cell + rng.randrange(self.cell), cell)
+
+    def sample(self, rng: random.Random) -> tuple:
+        x, y, _ = self.sample_cell(rng)
+        return x, y
+
+    # Poisson disc style placement of count enemies at least spacing apart. Each one takes the cells around it out
+    # for the ones after it, once no cell is left they all come back and the next layer starts.
+    def spread(self, rng: random.Random, count: int, spacing: int) -> list:
+        reach = -(-spacing // self.cell)
+        disc = [(dc, dr) for dr in range(-reach, reach + 1) for dc in range(-reach, reach + 1)
+                if dc * dc + dr * dr <= reach * reach]
+        positions = []
+        claimed = []
+        for _ in range(count):
+            x, y, cell = self.sample_cell(rng)
+            positions.append((x, y))
+            row, column = divmod(cell, self.columns)
+            for dc, dr in disc:
+                if 0 <= column + dc < self.columns and 0 <= row + dr < self.rows:
+                    neighbour = (row + dr) * self.columns + column + dc
+                    if self.slots[neighbour] >= 0:
+                        self.remove(neighbour)
+                        claimed.append(neighbour)
+            if not self.count:
+                self.release(claimed)
+        self.release(claimed)
+        return positions
+
+    def release(self, claimed: list):
+        for cell in claimed:
+            self.add(cell)
+        claimed.clear()
+
+
+# Entities and their location
+class Collectible:
+    def __init__(self, x: float, y: float, sprite: pygame.Surface):
+        self.x = x
+        self.y = y
+        self.sprite = sprite
+        self.rect = self.sprite.get_rect()
+        self.grid = None
+        self.spawner = None
+    
+    # Update entity sprite loaction and state
+    def update(self):
+        pass
+    
+    # Render entity sprite on the screen
+    def render(self, screen: pygame.Surface):
+        screen.blit(self.sprite, (self.x, self.y))
+
+    # Move the entity, keeping the spatial hash it lives in up to date
+    def set_position(self, x: float, y: float):
+        self.x = x
+        self.y = y
+        self.rect.x = self.x
+        self.rect.y = self.y
+        if self.grid is not None:
+            self.grid.move(self)
+
+    # Randomize spawn location, games pass their own seeded generator so runs can be played again
+    def randomize_position(self, rng: random.Random = random):
+        if self.spawner is not None:
+            self.set_position(*self.spawner.sample(rng))
+        else:
+            area = SpawnSampler.area
+            self.set_position(rng.randint(area.left, area.right - 1), rng.randint(area.top, area.bottom - 1))
+
+
+# Score triggers sorted by threshold with a cursor on the next one that hasn't fired. A score change below that
+# threshold costs one comparison, crossing it fires everything up to the new score in order. Kinds without a
+# handler are skipped.
+class TriggerEngine:
+    def __init__(self, triggers: list, handlers: dict):
+        # Stable sort, triggers on the same score fire in file order
+        self.triggers = sorted(triggers, key=lambda trigger: trigger[0])
+        self.handlers = handlers
+        self.reset()
+
+    def reset(self):
+        self.cursor = 0
+        self.next = self.triggers[0][0] if self.triggers else math.inf
+
+    def update(self, score: int):
+        if score < self.next:
+            return
+        triggers = self.triggers
+        while self.cursor < len(triggers) and triggers[self.cursor][0] <= score:
+            _, kind, value = triggers[self.cursor]
+            self.cursor += 1
+            handler = self.handlers.get(kind)
+            if handler is not None:
+                handler(value)
+        self.next = triggers[self.cursor][0] if self.cursor < len(triggers) else math.inf
+
+
+# Uniform grid of buckets, looking up what is near a rect only visits the cells that rect covers
+class SpatialHash:
+    def __init__(self, cell_size: int = 64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entity_cells = {}
+        # Bumped whenever a bucket changes, with the cells of the last query it tells if its result still holds
+        self.version = 0
+        self.last_query = None
+        self.last_version = -1
+        self.found = set()
+
+    def cells_for(self, rect: pygame.Rect) -> list:
+        size = self.cell_size
+        return [(cx, cy)
+                for cx in range(rect.left // size, (rect.right - 1) // size + 1)
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+    def insert(self, entity, cells: list = None):
+        if cells is None:
+            cells = self.cells_for(entity.rect)
+        self.entity_cells[entity] = cells
+        self.version += 1
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(entity)
+
+    # Emptied buckets stay around, the screen only has so many cells and a respawn is likely to need one again
+    def remove(self, entity):
+        self.version += 1
+        for cell in self.entity_cells.pop(entity, ()):
+            self.cells[cell].discard(entity)
+
+    # Only touches the buckets when the entity actually ended up in different cells
+    def move(self, entity):
+        cells = self.cells_for(entity.rect)
+        if self.entity_cells.get(entity) != cells:
+            self.remove(entity)
+            self.insert(entity, cells)
+
+    # Everything sharing a cell with rect, callers still do the exact overlap test and must not change the set.
+    # A player crossing the same cells step after step gets the last set back without building a new one.
+    def query(self, rect: pygame.Rect) -> set:
+        size = self.cell_size
+        left, right = rect.left // size, (rect.right - 1) // size
+        top, bottom = rect.top // size, (rect.bottom - 1) // size
+        last = self.last_query
+        if (self.version == self.last_version and last[0] == left and last[1] == right and last[2] == top
+                and last[3] == bottom):
+            return self.found
+        found = set()
+        for cx in range(left, right + 1):
+            for cy in range(top, bottom + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        self.last_query = (left, right, top, bottom)
+        self.last_version = self.version
+        self.found = found
+        return found
+
+
+# Background with the collectibles and the snake's body baked in, so thousands of mostly still things cost
+# nothing per frame
+class EntityLayer:
+    # Changes are kept both as they are and as the tiles they touch. A flush repaints whichever covers fewer pixels:
+    # a few changes are cheapest one by one, but when hundreds of collectibles get picked up at once their areas
+    # overlap and repainting the tiles around them once is far cheaper. Past max_pending only the tiles are kept.
+    max_pending = 64
+    tile_size = 128
+
+    def __init__(self, background: pygame.Surface, grid: SpatialHash, body=None):
+        self.background = background
+        self.surface = background.copy()
+        self.grid = grid
+        self.body = body
+        self.pending = []
+        self.pending_area = 0
+        self.added = []
+        self.columns = -(-self.surface.get_width() // self.tile_size)
+        self.rows = -(-self.surface.get_height() // self.tile_size)
+        self.tiles = bytearray(self.columns * self.rows)
+        self.clean = bytes(len(self.tiles))
+        self.stale = True
+
+    # Repaint everything on the next flush
+    def invalidate(self):
+        self.stale = True
+        self.pending.clear()
+        self.pending_area = 0
+        self.added.clear()
+        self.tiles[:] = self.clean
+
+    # Remember that something inside rect changed, the repaint happens when the frame is drawn
+    def changed(self, rect: pygame.Rect):
+        if self.stale:
+            return
+        self.mark(rect)
+        if len(self.pending) < self.max_pending:
+            self.pending.append(rect)
+            self.pending_area += rect.width * rect.height
+        else:
+            self.pending_area = -1
+
+    def mark(self, rect: pygame.Rect):
+        size = self.tile_size
+        first, last = max(rect.left // size, 0), min((rect.right - 1) // size, self.columns - 1)
+        for row in range(max(rect.top // size, 0), min((rect.bottom - 1) // size, self.rows - 1) + 1):
+            start = row * self.columns
+            self.tiles[start + first:start + last + 1] = b"\x01" * (last - first + 1)
+
+    # Only what's underneath the old spot has to be repainted, the new spot simply gets drawn on top
+    def moved(self, entity, old_rect: pygame.Rect):
+        self.changed(old_rect)
+        if not self.stale:
+            self.added.append(entity)
+
+    # Dirty tiles as one area per run of neighbours in a row
+    def tile_areas(self) -> list:
+        size, bounds, areas = self.tile_size, self.surface.get_rect(), []
+        for row in range(self.rows):
+            line = self.tiles[row * self.columns:(row + 1) * self.columns]
+            column = line.find(1)
+            while column != -1:
+                end = line.find(0, column)
+                end = self.columns if end == -1 else end
+                areas.append(pygame.Rect(column * size, row * size, (end - column) * size, size).clip(bounds))
+                column = line.find(1, end)
+        return areas
+
+    # Bring the layer up to date, returns the areas that changed or None when everything was repainted
+    def flush(self, entities: list):
+        if self.stale:
+            self.surface.blit(self.background, (0, 0))
+            self.surface.blits([(entity.sprite, entity.rect) for entity in entities], False)
+            if self.body is not None:
+                self.body.draw(self.surface, self.surface.get_rect())
+            self.stale = False
+            return None
+
+        if self.pending_area < 0 or self.pending_area > self.tiles.count(1) * self.tile_size ** 2:
+            areas = self.tile_areas()
+        else:
+            areas = self.pending
+        self.pending = []
+        self.pending_area = 0
+        # Moved entities are left out of the repaints and drawn once on top, blending them twice would show
+        added = dict.fromkeys(self.added)
+        self.added = []
+
+        # Each area is repainted from the background and only what overlaps it, clipped to it
+        for rect in areas:
+            self.surface.set_clip(rect)
+            self.surface.blit(self.background, rect, rect)
+            self.surface.blits([(other.sprite, other.rect) for other in self.grid.query(rect)
+                                if other not in added and other.rect.colliderect(rect)], False)
+            if self.body is not None:
+                self.body.draw(self.surface, rect)
+
+        # The body stays on top of them, only the part of it over the sprite is drawn again
+        for entity in added:
+            self.surface.set_clip(entity.rect)
+            self.surface.blit(entity.sprite, entity.rect)
+            if self.body is not None:
+                self.body.draw(self.surface, entity.rect)
+        self.surface.set_clip(None)
+
+        # Hundreds of small areas reach the screen as the tiles around them instead, copying whole tiles of the
+        # finished layer is cheaper than restoring and pushing every one of them
+        if len(areas) + len(added) > self.max_pending:
+            for entity in added:
+                self.mark(entity.rect)
+            areas = self.tile_areas()
+        else:
+            areas.extend(entity.rect.copy() for entity in added)
+        self.tiles[:] = self.clean
+        return areas
+
+
+# The snake's body: the head's trail in a preallocated ring buffer, plus a grid counting the segments in every
+# cell so running into the body is a single lookup no matter how long the snake gets
+class SnakeBody:
+    # Distance the head travels between two trail points, also the size of a grid cell
+    spacing = 20
+    # Trail points right behind the head that aren't part of the body yet, so the head can't hit its own neck
+    neck = 4
+
+    def __init__(self, capacity: int = 16384, width: int = 1280, height: int = 720):
+        self.capacity = capacity
+        self.xs = array("h", bytes(2 * capacity))
+        self.ys = array("h", bytes(2 * capacity))
+        self.columns = width // self.spacing + 1
+        self.rows = height // self.spacing + 1
+        self.occupancy = array("H", bytes(2 * self.columns * self.rows))
+        self.empty = bytes(2 * self.columns * self.rows)
+        self.segment = pygame.Surface((self.spacing, self.spacing), pygame.SRCALPHA)
+        pygame.draw.rect(self.segment, "#8B2323", (1, 1, self.spacing - 2, self.spacing - 2), border_radius=5)
+        self.changes = []
+        self.reset()
+
+    def reset(self):
+        memoryview(self.occupancy).cast("B")[:] = self.empty
+        self.end = 0
+        self.count = 0
+        self.length = 0
+        self.last_x = self.last_y = None
+        self.changes.clear()
+
+    # One more segment, the tail simply stops retiring until the trail is long enough
+    def grow(self):
+        if self.neck + self.length < self.capacity:
+            self.length += 1
+
+    def cell(self, x: float, y: float) -> int:
+        column = min(max(int(x) // self.spacing, 0), self.columns - 1)
+        row = min(max(int(y) // self.spacing, 0), self.rows - 1)
+        return row * self.columns + column
+
+    def occupied(self, x: float, y: float) -> bool:
+        return self.occupancy[self.cell(x, y)] > 0
+
+    # Follow the head to (x, y), returns True if it ran into the body on the way
+    def advance(self, x: float, y: float) -> bool:
+        if self.last_x is None:
+            self.last_x, self.last_y = x, y
+        last_x, last_y = self.last_x, self.last_y
+        distance = math.hypot(x - last_x, y - last_y)
+        spacing = self.spacing
+        # Without a body there's nothing in the grid to run into
+        body = self.length > 0
+        hit = False
+        if distance >= spacing:
+            push = self.push
+            while distance >= spacing:
+                last_x += (x - last_x) * spacing / distance
+                last_y += (y - last_y) * spacing / distance
+                distance -= spacing
+                hit = hit or (body and self.occupied(last_x, last_y))
+                push(last_x, last_y)
+            self.last_x, self.last_y = last_x, last_y
+        return hit or (body and self.occupied(x, y))
+
+    def push(self, x: float, y: float):
+        end, neck = self.end, self.neck
+        self.xs[end] = int(x)
+        self.ys[end] = int(y)
+        end += 1
+        if end == self.capacity:
+            end = 0
+        self.end = end
+        count = self.count + 1
+
+        # Retire the tail once the trail is longer than the body. Only points that already made it past the
+        # neck were ever counted in the grid.
+        while count > neck + self.length:
+            if count - 1 > neck:
+                self.occupy((end - count) % self.capacity, -1)
+            count -= 1
+        self.count = count
+
+        # The point that just left the neck becomes part of the body
+        if count > neck:
+            self.occupy((end - 1 - neck) % self.capacity, 1)
+
+    def occupy(self, index: int, delta: int):
+        cell = self.cell(self.xs[index], self.ys[index])
+        before = self.occupancy[cell]
+        self.occupancy[cell] = before + delta
+        # A cell only looks different when it goes from empty to used or back
+        if before == 0 or before + delta == 0:
+            column, row = cell % self.columns, cell // self.columns
+            self.changes.append(pygame.Rect(column * self.spacing, row * self.spacing, self.spacing, self.spacing))
+
+    # Cells that appeared or disappeared since the last call
+    def take_changes(self) -> list:
+        changes = self.changes
+        if changes:
+            self.changes = []
+        return changes
+
+    # Draw every used cell inside rect, segments sit on the grid so they never overlap each other
+    def draw(self, surface: pygame.Surface, rect: pygame.Rect):
+        size = self.spacing
+        first_row, last_row = max(rect.top // size, 0), min((rect.bottom - 1) // size, self.rows - 1)
+        first_column, last_column = max(rect.left // size, 0), min((rect.right - 1) // size, self.columns - 1)
+        surface.blits([(self.segment, (column * size, row * size))
+                       for row in range(first_row, last_row + 1)
+                       for column in range(first_column, last_column + 1)
+                       if self.occupancy[row * self.columns + column]], False)
+
+
+# Compact binary log of a run's input: the seed and the tick of every key press are all it takes to play the
+# run again exactly. A 24 byte header followed by 5 bytes per key press.
+class InputRecording:
+    magic = b"BSR1"
+    header = struct.Struct("<4sQIII")
+    event = struct.Struct("<IB")
+    directions = list(DIRECTION_ANGLES)
+
+    def __init__(self, seed: int, collectibles: int = 1):
+        self.events = bytearray()
+        self.restart(seed, collectibles)
+
+    # Start over for the next run, the buffer for the presses is kept
+    def restart(self, seed: int, collectibles: int = 1):
+        self.seed = seed
+        self.collectibles = collectibles
+        self.ticks = 0
+        self.score = 0
+        self.events.clear()
+
+    # The player pressed direction right before simulation step tick
+    def record(self, tick: int, direction: str):
+        self.events += self.event.pack(tick, self.directions.index(direction))
+
+    def finish(self, ticks: int, score: int):
+        self.ticks = ticks
+        self.score = score
+
+    # (tick, direction) for every key press in order
+    def presses(self) -> list:
+        return [(tick, self.directions[code]) for tick, code in self.event.iter_unpack(self.events)]
+
+    def to_bytes(self) -> bytes:
+        return self.header.pack(self.magic, self.seed, self.collectibles, self.ticks, self.score) + self.events
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        magic, seed, collectibles, ticks, score = cls.header.unpack_from(data)
+        if magic != cls.magic:
+            raise ValueError("not an input recording")
+        recording = cls(seed, collectibles)
+        recording.finish(ticks, score)
+        recording.events = bytearray(data[cls.header.size:])
+        return recording
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+# Every finished run in an SQLite database. Runs are handed to a background thread that writes them in batches, one
+# transaction per batch, so a frame never waits on the disk. Both the overall and the per player top lists come
+# straight from an index, no matter how many runs are stored.
+class ScoreStore:
+    schema = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            player TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            ticks INTEGER NOT NULL,
+            finished REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS runs_by_score ON runs (score DESC);
+        CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, score DESC);
+    """
+
+    def __init__(self, path: str, batch_size: int = 512):
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        # Runs that were submitted but aren't in the database yet. The lock only guards this list, nobody waits on
+        # the disk while holding it.
+        self.pending = []
+        self.lock = threading.Lock()
+        self.reader = None
+        self.written = 0
+        self.thread = threading.Thread(target=self.write_behind, daemon=True)
+        self.thread.start()
+
+    # Queue a finished run, returns right away
+    def submit(self, player: str, score: int, ticks: int):
+        run = (player, score, ticks, time.time())
+        with self.lock:
+            self.pending.append(run)
+        self.queue.put(run)
+
+    def write_behind(self):
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            # Everything else that is already waiting goes into the same transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in batch
+            runs = [run for run in batch if run is not None]
+
+            if runs:
+                with connection:
+                    connection.executemany("INSERT INTO runs (player, score, ticks, finished) VALUES (?, ?, ?, ?)",
+                                           runs)
+                with self.lock:
+                    del self.pending[:len(runs)]
+                self.written += len(runs)
+            for _ in batch:
+                self.queue.task_done()
+        connection.close()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(self.schema)
+        return connection
+
+    # The best k runs as (player, score, ticks), of one player or everyone. Opens the database on first use.
+    def top(self, k: int = 10, player: str = None) -> list:
+        # Pending runs are copied before reading the database. A run committed in between shows up in both, the
+        # set drops the copy since its finish time is the same.
+        with self.lock:
+            pending = [run for run in self.pending if player is None or run[0] == player]
+        if self.reader is None:
+            self.reader = self.connect()
+        if player is None:
+            rows = self.reader.execute("SELECT player, score, ticks, finished FROM runs ORDER BY score DESC LIMIT ?",
+                                       (k,)).fetchall()
+        else:
+            rows = self.reader.execute("SELECT player, score, ticks, finished FROM runs WHERE player = ? "
+                                       "ORDER BY score DESC LIMIT ?", (player, k)).fetchall()
+        runs = sorted(set(rows + pending), key=lambda run: (run[1], run[3]), reverse=True)
+        return [run[:3] for run in runs[:k]]
+
+    # Wait until every submitted run is on disk
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+# Player class with all the attributes
+class Player:
+    # The player dies once its position leaves these bounds
+    min_x, max_x = 20, 1260
+    min_y, max_y = 20, 700
+
+    def __init__(self, x: float, y: float, sprite: pygame.Surface, scene_manager, orientations: int = 4):
+        self.x = x
+        self.y = y
+        self.prev_x = x
+        self.prev_y = y
+        # Every orientation is rotated once from the untouched sprite, turning just picks one
+        self.rotations = {angle: pygame.transform.rotate(sprite, angle)
+                          for angle in range(0, 360, 360 // orientations)}
+        self.base_sprite = sprite
+        self.sprite = self.rotations[0]
+        self.speed = 200
+        self.angle = 0
+        self.health = 100
+        self.direction = "up"
+        self.moving = False
+        self.rect = self.sprite.get_rect()
+        self.scene_manager = scene_manager
+
+    # Put the player back in its starting state, reusing the sprites and rect it already has
+    def reset(self, x: float, y: float) -> None:
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+        self.sprite = self.rotations[0]
+        self.speed = 200
+        self.angle = 0
+        self.health = 100
+        self.direction = "up"
+        self.moving = False
+        self.rect.size = self.sprite.get_size()
+        self.rect.topleft = (int(x), int(y))
+
+    # Update player's sprite location and state
+    def update(self, deltatime):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        if self.moving:
+            self.move(deltatime) 
+        self.rect.x = int(self.x)
+        self.rect.y = int(self.y)
+
+    # Position between the last two simulation steps, alpha is how far into the next step we are
+    def interpolated(self, alpha: float = 1.0) -> tuple:
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
+
+    # Render player's sprite on the screen
+    def render(self, screen: pygame.Surface, alpha: float = 1.0):
+        screen.blit(self.sprite, self.interpolated(alpha))
+
+
+    def set_angle(self, new_angle: int) -> None:
+        new_angle %= 360
+        if new_angle not in self.rotations:
+            self.rotations[new_angle] = pygame.transform.rotate(self.base_sprite, new_angle)
+        sprite = self.rotations[new_angle]
+
+        # Rotated sprites can have a different size, keep the player centered on the same spot
+        dx = (self.sprite.get_width() - sprite.get_width()) / 2
+        dy = (self.sprite.get_height() - sprite.get_height()) / 2
+        self.x += dx
+        self.y += dy
+        self.prev_x += dx
+        self.prev_y += dy
+
+        self.sprite = sprite
+        self.rect.size = sprite.get_size()
+        self.rect.topleft = (int(self.x), int(self.y))
+        self.angle = new_angle
+
+
+    def move(self, deltatime):
+        # Values for directions
+        if self.direction == "up":
+            self.y -= self.speed * deltatime
+        elif self.direction == "down":
+            self.y += self.speed * deltatime
+        elif self.direction == "left":
+            self.x -= self.speed * deltatime
+        elif self.direction == "right":
+            self.x += self.speed * deltatime
+
+    # Out of bounds is deadly, the main scene ends the run once the step is done
+    def outside(self) -> bool:
+        return self.x < self.min_x or self.x > self.max_x or self.y < self.min_y or self.y > self.max_y
+
+    # When during the last step the player first touched rect, None if it didn't
+    def sweep(self, rect: pygame.Rect):
+        return swept_collision(self.prev_x, self.prev_y, self.rect.width, self.rect.height,
+                               self.x - self.prev_x, self.y - self.prev_y, rect)
+
+    # When during the last step the player left the bounds, None if it stayed inside
+    def exit_time(self):
+        # Already outside at the start of the step, nothing after it counts
+        if not (self.min_x <= self.prev_x <= self.max_x and self.min_y <= self.prev_y <= self.max_y):
+            return 0.0
+        x = self.crossing(self.prev_x, self.x, self.min_x, self.max_x)
+        y = self.crossing(self.prev_y, self.y, self.min_y, self.max_y)
+        if x is None or (y is not None and y < x):
+            return y
+        return x
+
+    # When moving from start to end went past low or high, None if it didn't
+    @staticmethod
+    def crossing(start: float, end: float, low: float, high: float):
+        if end < low:
+            return (start - low) / (start - end)
+        if end > high:
+            return (high - start) / (end - start)
+        return None
+        
+# Text class 
+class Text:
+    def __init__(self, x, y, text: str, size: int = 36, color="white"):
+        self.x = x
+        self.y = y
+        self.size = size
+        self.color = color
+        self.text = text
+    
+    # Changing the text drops the cached surface, setting the same text again keeps it
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str):
+        if getattr(self, "_text", None) != text:
+            self._text = text
+            self.rendered = None
+
+    def update(self):
+        pass
+    
+    @property
+    def surface(self) -> pygame.Surface:
+        if self.rendered is None:
+            self.rendered = render_text(FONT_NAME, self.size, self.text, self.color)
+        return self.rendered
+
+    def render(self, screen: pygame.Surface):
+        screen.blit(self.surface, (self.x, self.y))
+
+# Initializes a score that keeps track of how many sprites have been collected
+class Score:
+    def __init__(self, x, y) -> None:
+        self.score = 0
+        self.x = x
+        self.y = y
+        self.size = 40
+        self.shown = self.score
+        self.text = str(self.score)
+        self.rendered = None
+
+    def add_score(self):
+        self.score += 1
+
+    # Runs every step, only a score that actually changed gets a new surface
+    def update(self):
+        if self.score != self.shown:
+            self.shown = self.score
+            self.text = str(self.score)
+            self.rendered = None
+
+    # Composed from the glyph atlas, the score changes far too often to rasterize every new number
+    @property
+    def surface(self) -> pygame.Surface:
+        if self.rendered is None:
+            self.rendered = get_atlas(FONT_NAME, self.size, "white").compose(self.text)
+        return self.rendered
+    
+    def render(self, screen: pygame.Surface):
+        screen.blit(self.surface, (self.x, self.y))
+
+# Keeps the main loop at a steady frame rate instead of spinning a whole core
+class FramePacer:
+    def __init__(self, target_fps: int = 60, idle_fps: int = 15):
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        # Sleep usually overshoots a little, so the last stretch of every frame is busy-waited
+        self.spin_margin = 0.002
+        self.frame_start = time.perf_counter()
+        self.work_time = 0.0
+        self.frame_time = 0.0
+        self.budget = 1 / target_fps
+
+    # Wait until the current frame's budget is used up, returns the full frame time
+    def tick(self, idle: bool = False) -> float:
+        self.budget = 1 / (self.idle_fps if idle else self.target_fps)
+        now = time.perf_counter()
+        self.work_time = now - self.frame_start
+        deadline = self.frame_start + self.budget
+
+        remaining = deadline - now
+        if remaining > self.spin_margin:
+            requested = remaining - self.spin_margin
+            time.sleep(requested)
+            # Adapt the spin margin to how late the OS actually wakes us up
+            overshoot = time.perf_counter() - now - requested
+            self.spin_margin = min(max(0.9 * self.spin_margin + 0.2 * overshoot, 0.0005), 0.004)
+        while time.perf_counter() < deadline:
+            pass
+
+        # A frame that ran over budget starts the next one from now instead of trying to catch up
+        now = time.perf_counter()
+        self.frame_time = now - self.frame_start
+        self.frame_start = now
+        return self.frame_time
+
+    # How much of the frame budget the last frame's work used up (1.0 is all of it)
+    def budget_used(self) -> float:
+        return self.work_time / self.budget
+
+    def report(self) -> dict:
+        return {"target_fps": self.target_fps,
+                "budget_ms": self.budget * 1000,
+                "work_ms": self.work_time * 1000,
+                "frame_ms": self.frame_time * 1000,
+                "budget_used": self.budget_used()}
+
+
+# The game always lays itself out on a 1280x720 logical screen. The viewport puts that onto a window of any size,
+# scaled by the largest factor that fits and centered between black bars. Scaled copies of backgrounds and sprites
+# are made once per window size and kept, whole number factors use plain pixel scaling instead of smoothscale.
+class Viewport:
+    logical_size = (1280, 720)
+
+    def __init__(self, surface: pygame.Surface, logical_size: tuple = None):
+        self.logical_size = logical_size or self.logical_size
+        self.resize(surface)
+
+    def resize(self, surface: pygame.Surface):
+        self.surface = surface
+        width, height = surface.get_size()
+        logical_width, logical_height = self.logical_size
+        scale = min(width / logical_width, height / logical_height)
+        # 2560x1440 and 3840x2160 windows land exactly on 2x and 3x
+        self.integer = scale >= 1 and scale == int(scale)
+        self.scale = int(scale) if self.integer else scale
+        self.offset = ((width - math.ceil(logical_width * scale)) // 2, (height - math.ceil(logical_height * scale)) // 2)
+        self.identity = self.scale == 1 and self.offset == (0, 0)
+        self.cache = {}
+
+    # Where a logical rect ends up on the window, the same area a scaled surface drawn at rect covers
+    def map(self, rect: pygame.Rect) -> pygame.Rect:
+        if self.identity:
+            return rect
+        scale = self.scale
+        return pygame.Rect(self.offset[0] + math.floor(rect.x * scale), self.offset[1] + math.floor(rect.y * scale),
+                           math.ceil(rect.width * scale), math.ceil(rect.height * scale))
+
+    # surface at window scale, made on first use and kept until the window size changes. The least recently used
+    # copies go once there are too many, the score alone makes a new surface every time it changes.
+    def scaled(self, surface: pygame.Surface) -> pygame.Surface:
+        if self.scale == 1:
+            return surface
+        scaled = self.cache.pop(surface, None)
+        if scaled is None:
+            width, height = surface.get_size()
+            scaled = self.resample(surface, (math.ceil(width * self.scale), math.ceil(height * self.scale)))
+            if len(self.cache) >= 256:
+                del self.cache[next(iter(self.cache))]
+        self.cache[surface] = scaled
+        return scaled
+
+    def resample(self, surface: pygame.Surface, size: tuple) -> pygame.Surface:
+        if self.integer or surface.get_bitsize() < 24:
+            return pygame.transform.scale(surface, size)
+        return pygame.transform.smoothscale(surface, size)
+
+    # Part of a surface that is already cached changed, only that part gets scaled again
+    def refresh(self, surface: pygame.Surface, rect: pygame.Rect):
+        if self.scale == 1:
+            return
+        rect = rect.clip(surface.get_rect())
+        if not rect:
+            return
+        target = self.map(rect).move(-self.offset[0], -self.offset[1])
+        self.scaled(surface).blit(self.resample(surface.subsurface(rect), target.size), target)
+
+
+# Remembers what was drawn last frame so only the parts of the screen that changed get pushed
+class DirtyRenderer:
+    def __init__(self, screen: pygame.Surface, viewport: Viewport = None):
+        # Without a viewport the screen is drawn on one to one
+        self.viewport = viewport or Viewport(screen, screen.get_size())
+        self.drawn = {}
+        self.full_redraw = True
+        self.pushed = []
+
+    # Redraw and push the whole screen on the next frame, e.g. after switching scenes
+    def invalidate(self):
+        self.full_redraw = True
+
+    # Whatever the viewport draws on, the window or a headless surface
+    @property
+    def screen(self) -> pygame.Surface:
+        return self.viewport.surface
+
+    # Put the background back over a logical rect, returns the window area that was restored
+    def restore(self, background: pygame.Surface, rect: pygame.Rect) -> pygame.Rect:
+        viewport = self.viewport
+        target = viewport.map(rect)
+        self.screen.fill("black", target)
+        self.screen.blit(viewport.scaled(background), target, target.move(-viewport.offset[0], -viewport.offset[1]))
+        return target
+
+    def blit(self, surface: pygame.Surface, rect: pygame.Rect) -> pygame.Rect:
+        target = self.viewport.map(rect)
+        self.screen.blit(self.viewport.scaled(surface), target)
+        return target
+
+    # Draw (key, surface, position) items in order and push the changed rects, returns what was pushed.
+    # Positions are logical, areas are parts of the background itself that changed since the last frame.
+    def draw(self, background: pygame.Surface, items: list, areas: list = ()) -> list:
+        for rect in areas:
+            self.viewport.refresh(background, rect)
+        current = {}
+        for key, surface, pos in items:
+            current[key] = (surface, surface.get_rect(topleft=(int(pos[0]), int(pos[1]))))
+
+        if self.full_redraw:
+            self.screen.fill("black")
+            self.screen.blit(self.viewport.scaled(background), self.viewport.offset)
+            for surface, rect in current.values():
+                self.blit(surface, rect)
+            self.drawn = current
+            self.full_redraw = False
+            pygame.display.update()
+            self.pushed = [self.screen.get_rect()]
+            return self.pushed
+
+        # An item changed if it appeared, disappeared, moved or got a different surface
+        # touched is in logical rects, pushed the same areas on the window
+        changed = set()
+        touched = []
+        pushed = []
+        for rect in areas:
+            pushed.append(self.restore(background, rect))
+            touched.append(rect)
+        for key in self.drawn.keys() | current.keys():
+            old = self.drawn.get(key)
+            new = current.get(key)
+            if old is not None and new is not None and old[0] is new[0] and old[1] == new[1]:
+                continue
+            changed.add(key)
+            if old is not None:
+                pushed.append(self.restore(background, old[1]))
+                touched.append(old[1])
+            if new is not None:
+                pushed.append(self.viewport.map(new[1]))
+                touched.append(new[1])
+
+        # Redraw changed items, plus anything overlapping an area that was restored or redrawn
+        for key, (surface, rect) in current.items():
+            if key in changed or rect.collidelist(touched) != -1:
+                self.blit(surface, rect)
+                touched.append(rect)
+
+        self.drawn = current
+        if pushed:
+            pygame.display.update(pushed)
+        self.pushed = pushed
+        return pushed
+
+
+# Times every phase of each frame and keeps the last few hundred frames in a ring buffer
+class FrameProfiler:
+    phases = ("events", "update", "render", "frame")
+    # Frames between two refreshes of the overlay's numbers, half a second at 60 FPS
+    refresh_every = 30
+
+    def __init__(self, size: int = 600):
+        self.size = size
+        self.timings = {phase: [0.0] * size for phase in self.phases}
+        self.scenes = [""] * size
+        self.index = 0
+        self.count = 0
+        # Every frame ever ended, count stops at size once the buffer is full
+        self.frames = 0
+        self.overlay_frame = None
+        self.overlay_scene = None
+        self.frame_start = time.perf_counter()
+        self.overlay = False
+        self.overlay_rect = pygame.Rect(900, 10, 370, 110)
+        self.overlay_header = ""
+        self.overlay_lines = []
+
+    # Run one phase of the frame and record how long it took
+    def measure(self, phase: str, function):
+        start = time.perf_counter()
+        function()
+        self.timings[phase][self.index] = time.perf_counter() - start
+
+    # Close the current frame, its total time includes waiting on the frame pacer
+    def end_frame(self, scene: str):
+        now = time.perf_counter()
+        self.timings["frame"][self.index] = now - self.frame_start
+        self.scenes[self.index] = scene
+        self.frame_start = now
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.frames += 1
+
+    # Oldest to newest frame indexes still held in the ring buffer
+    def frame_indexes(self) -> list:
+        start = self.index - self.count
+        return [(start + i) % self.size for i in range(self.count)]
+
+    # p50/p95/p99 of a phase in milliseconds, only over the frames spent in scene if one is given. Scenes cost
+    # very different amounts, mixed together the numbers wouldn't say much about any of them.
+    def percentiles(self, phase: str, scene: str = None) -> dict:
+        values = sorted(self.timings[phase][i] for i in self.frame_indexes()
+                        if scene is None or self.scenes[i] == scene)
+        if not values:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+        pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+    def summary(self, scene: str = None) -> dict:
+        return {phase: self.percentiles(phase, scene) for phase in self.phases}
+
+    # A summary for every scene still in the buffer, in the order they were first seen
+    def scene_summaries(self) -> dict:
+        return {scene: self.summary(scene) for scene in dict.fromkeys(self.scenes[i] for i in self.frame_indexes())}
+
+    # Write the buffered frames to CSV or JSON, picked by the file extension. extra goes into the JSON summary.
+    def export(self, path: str, extra: dict = None):
+        rows = [{"scene": self.scenes[i], **{f"{phase}_ms": self.timings[phase][i] * 1000 for phase in self.phases}}
+                for i in self.frame_indexes()]
+        with open(path, "w", newline="") as file:
+            if path.endswith(".json"):
+                json.dump({"summary": {**self.summary(), **(extra or {})}, "scenes": self.scene_summaries(),
+                           "frames": rows}, file, indent=2)
+            else:
+                writer = csv.DictWriter(file, ["scene"] + [f"{phase}_ms" for phase in self.phases])
+                writer.writeheader()
+                writer.writerows(rows)
+
+    # Draw the stats box for the scene on screen in the top right corner and push just that part of the screen
+    def draw(self, screen: pygame.Surface, scene: str = None):
+        # The numbers only change text every half second or on a scene change, so the text cache isn't churned
+        # every frame
+        if (self.overlay_frame is None or self.frames - self.overlay_frame >= self.refresh_every
+                or scene != self.overlay_scene):
+            self.overlay_frame = self.frames
+            self.overlay_scene = scene
+            summary = self.summary(scene)
+            self.overlay_header = "ms       p50    p95    p99" + (f"   {scene}" if scene else "")
+            self.overlay_lines = [f"{phase:<7}" + " ".join(f"{value:6.2f}" for value in summary[phase].values())
+                                  for phase in self.phases]
+        # Always in the window's corner, whatever size it is
+        self.overlay_rect.topright = (screen.get_width() - 10, 10)
+        screen.fill("black", self.overlay_rect)
+        x, y = self.overlay_rect.x + 10, self.overlay_rect.y + 5
+        screen.blit(render_text(FONT_NAME, 14, self.overlay_header, "yellow"), (x, y))
+        for i, line in enumerate(self.overlay_lines, 1):
+            screen.blit(render_text(FONT_NAME, 14, line, "white"), (x, y + i * 20))
+        pygame.display.update(self.overlay_rect)
+
+
+# The one place that reads SDL's event queue. Only the event types the game reacts to get into the queue at all,
+# the bound keys are held as bits of one integer and every press becomes a command stamped with the time it was
+# read. Scenes take the commands of the frame instead of going through pygame's events.
+class InputSystem:
+    # SDL 2 reports an uncovered window both ways, older pygame builds only have the first
+    expose = [pygame.VIDEOEXPOSE] + ([pygame.WINDOWEXPOSED] if hasattr(pygame, "WINDOWEXPOSED") else [])
+    allowed = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.VIDEORESIZE] + expose
+    bindings = {
+        pygame.K_w: "up",
+        pygame.K_UP: "up",
+        pygame.K_d: "right",
+        pygame.K_RIGHT: "right",
+        pygame.K_s: "down",
+        pygame.K_DOWN: "down",
+        pygame.K_a: "left",
+        pygame.K_LEFT: "left",
+        pygame.K_SPACE: "start",
+        pygame.K_r: "restart",
+        pygame.K_q: "quit",
+        pygame.K_F3: "overlay",
+    }
+
+    def __init__(self):
+        self.bits = {key: 1 << index for index, key in enumerate(self.bindings)}
+        # Every key bound to a command, so holding either W or UP counts as holding "up"
+        self.masks = {}
+        for key, command in self.bindings.items():
+            self.masks[command] = self.masks.get(command, 0) | self.bits[key]
+        self.state = 0
+        self.commands = []
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    # Needs the display to be up. Mouse motion, text and every window event but exposing are dropped by SDL from
+    # then on.
+    def setup(self):
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.allowed)
+
+    # Read everything that came in since the last frame
+    def poll(self):
+        now = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.commands.append((now, "close"))
+            elif event.type == pygame.VIDEORESIZE:
+                self.commands.append((now, "resize"))
+            elif event.type in self.expose:
+                self.commands.append((now, "expose"))
+            elif event.type == pygame.KEYDOWN and event.key in self.bits:
+                self.state |= self.bits[event.key]
+                self.commands.append((now, self.bindings[event.key]))
+            elif event.type == pygame.KEYUP and event.key in self.bits:
+                self.state &= ~self.bits[event.key]
+
+    # The commands of this frame as (timestamp, command) in the order they were pressed
+    def take(self) -> list:
+        if not self.commands:
+            return ()
+        commands, self.commands = self.commands, []
+        return commands
+
+    def held(self, command: str) -> bool:
+        return bool(self.state & self.masks[command])
+
+    # A command read at timestamp just took effect in the game
+    def applied(self, timestamp: float):
+        if timestamp is None:
+            return
+        latency = time.perf_counter() - timestamp
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def latency(self) -> dict:
+        return {"commands": self.latency_count,
+                "mean_ms": self.latency_total / self.latency_count * 1000 if self.latency_count else 0.0,
+                "max_ms": self.latency_max * 1000}
+
+
+# Manager of all scenes, includes score mapping
+class SceneManager:
+    def __init__(self):
+        self.scenes = {}
+        self.quit = False
+        self.score = Score(600, 80)  # Initialize score here
+        self.highscore = 0
+        self.loader = None
+        self.audio = AudioManager()
+        self.input = InputSystem()
+        # Shared by every scene's renderer when there is a window, scenes draw one to one without it
+        self.viewport = None
+        self.profiler = None
+        # Where finished runs are kept between sessions, scores only live in memory without one
+        self.scores = None
+        self.player = "player"
+
+    def initialize(self, scenes: dict, starting_scene: str):
+        self.scenes = scenes
+        self.current_scene = self.scenes[starting_scene]
+        self.current_scene.on_enter()
+    
+    def set_scene(self, new_scene: str):
+        self.current_scene = self.scenes[new_scene]
+        self.current_scene.on_enter()
+
+    def get_scene(self):
+        return self.current_scene
+    
+    def quit_game(self):
+        self.quit = True
+
+    # F3 shows or hides the frame time overlay
+    def toggle_overlay(self):
+        if self.profiler is None:
+            return
+        self.profiler.overlay = not self.profiler.overlay
+        # The overlay was drawn straight onto the screen, so the scene has to repaint underneath it
+        self.current_scene.renderer.invalidate()
+    
+    # The window changed size, everything is scaled again for the new one
+    def resize(self):
+        if self.viewport is None:
+            return
+        self.viewport.resize(pygame.display.get_surface())
+        self.current_scene.renderer.invalidate()
+
+    def reset_main(self) -> None:
+        self.score.score = 0
+        self.score.update()
+        self.scenes["main"].reset()
+
+    def get_score(self):
+        return self.score
+
+    def add_score(self):
+        self.score.add_score()
+
+        # Update highscore if current score is higher
+        if self.score.score > self.highscore:
+            self.highscore = self.score.score
+    
+    def get_highscore(self):
+        return self.highscore
+
+    def submit_run(self, ticks: int):
+        if self.scores is not None:
+            self.scores.submit(self.player, self.score.score, ticks)
+
+    # The best runs so far, including earlier sessions when there is a score store
+    def top_scores(self, k: int) -> list:
+        if self.scores is None:
+            return []
+        top = self.scores.top(k)
+        if top and top[0][1] > self.highscore:
+            self.highscore = top[0][1]
+        return top
+
+    # The main scene only exists once everything it needs has been loaded
+    def assets_ready(self) -> bool:
+        return "main" in self.scenes
+
+    def loading_progress(self) -> float:
+        return self.loader.progress if self.loader else 1.0
+
+
+class Scene:
+    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
+        self.manager = manager 
+        self.screen = screen
+        self.sprites = sprites
+        self.renderer = DirtyRenderer(screen, manager.viewport)
+    
+    # Bring the scene back to its starting state without rebuilding it
+    def reset(self):
+        pass
+
+    # Called every time the scene becomes the current one
+    def on_enter(self):
+        self.renderer.invalidate()
+
+    def update(self):
+        pass
+
+    def render(self):
+        pass
+
+    # Take this frame's commands from the input system, closing or resizing the window and F3 work the same in
+    # every scene
+    def poll_events(self):
+        for timestamp, command in self.manager.input.take():
+            if command == "close":
+                self.manager.quit_game()
+            elif command == "resize":
+                self.manager.resize()
+            elif command == "expose":
+                # The window system threw away what was on screen, a static scene wouldn't draw it again by itself
+                self.renderer.invalidate()
+            elif command == "overlay":
+                self.manager.toggle_overlay()
+            else:
+                self.handle_command(command, timestamp)
+
+    # React to a single command, headless runs feed scripted commands in here directly
+    def handle_command(self, command: str, timestamp: float = None):
+        pass
+
+    # Static scenes return True so the game can drop to the idle tick rate
+    def is_idle(self) -> bool:
+        return False
+
+
+# Main scene, main gameplay 
+class MainScene(Scene):
+    # The simulation always advances in steps of this size, no matter how fast frames are rendered
+    step_time = 1 / 120
+    # Longest stretch of time a single frame may feed into the simulation, so a stall doesn't snowball
+    max_frame_time = 0.25
+    # Closest a horde's enemies start to each other, while there's room for it
+    horde_spacing = 120
+    # Up to this many collectibles are quicker to sweep one by one than to look up in the spatial hash
+    few = 8
+
+    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict, collectibles: int = 1,
+                 seed: int = None):
+        super().__init__(manager, screen, sprites)
+        # Every run draws from its own seeded generator and counts its steps, together with the recorded input
+        # that's enough to play it again
+        self.rng = random.Random()
+        self.seed = None
+        self.ticks = 0
+        self.recording = InputRecording(0)
+        self.record_path = None
+        self.previous_time = None
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.player = Player(600, 300, self.sprites["doom"], self.manager)
+        self.area = pygame.Rect(0, 0, 0, 0)
+        # Area the player swept through during the last step, reused every step
+        self.path = pygame.Rect(0, 0, 0, 0)
+
+        # Horde mode has many collectibles, they live in a spatial hash and are drawn as part of the background
+        self.grid = SpatialHash()
+        self.spawner = SpawnSampler()
+        self.initial_collectibles = collectibles
+        self.collectibles = [Collectible(200, 200, self.sprites["entity"]) for _ in range(collectibles)]
+        for collectible in self.collectibles:
+            collectible.grid = self.grid
+            collectible.spawner = self.spawner
+        self.start_run(seed)
+        self.place(self.collectibles)
+        self.body = SnakeBody()
+        self.layer = EntityLayer(self.sprites["background"], self.grid, self.body)
+        # How much faster every collected enemy makes the player, speed triggers change it
+        self.speed_step = 50
+        self.triggers = TriggerEngine(load_triggers(), {"message": self.display_message,
+                                                        "speed": self.set_speed_step,
+                                                        "spawn": self.spawn})
+        
+        self.displayed_message = None
+        self.message_text = Text(80, 30, "")
+        # Direction pressed since the last step and when it was read, the latest press wins
+        self.pending_turn = None
+
+        self.collect_sound = load_sound(*SOUNDS["collect"])
+
+    # Music is paused while the death screen is up
+    def on_enter(self):
+        super().on_enter()
+        self.manager.audio.resume_music()
+
+    def reset(self, seed: int = None):
+        self.previous_time = None
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self.player.reset(600, 300)
+        self.start_run(seed)
+        # Enemies spawned by triggers go away again, before anything is drawn from the new run's generator
+        for collectible in self.collectibles[self.initial_collectibles:]:
+            self.grid.remove(collectible)
+        del self.collectibles[self.initial_collectibles:]
+        self.place(self.collectibles)
+        self.body.reset()
+        self.layer.invalidate()
+        self.pending_turn = None
+        self.speed_step = 50
+        self.triggers.reset()
+        self.displayed_message = None
+        self.message_text.text = ""
+
+    # A fresh seed, tick count and recording for the next run
+    def start_run(self, seed: int = None):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng.seed(self.seed)
+        # The sampler's cell order changes as cells come and go, it has to start over with the generator
+        self.spawner.reset(self.player_area())
+        self.ticks = 0
+        self.recording.restart(self.seed, len(self.collectibles))
+
+    def finish_run(self):
+        self.recording.finish(self.ticks, self.manager.get_score().score)
+        self.manager.submit_run(self.ticks)
+        if self.record_path:
+            self.recording.save(self.record_path)
+
+    def update(self):
+        # Feed the elapsed time into the accumulator and run as many fixed steps as it covers
+        now = time.perf_counter()
+        if self.previous_time is None:
+            self.previous_time = now
+        frame_time = min(now - self.previous_time, self.max_frame_time)
+        self.previous_time = now
+
+        self.accumulator += frame_time
+        while self.accumulator >= self.step_time:
+            self.step(self.step_time)
+            self.accumulator -= self.step_time
+            # Stop simulating once the player died, the rest of the frame belongs to the death scene
+            if self.manager.get_scene() is not self:
+                self.accumulator = 0.0
+                break
+
+        self.alpha = self.accumulator / self.step_time
+
+    # Advance the game by exactly one simulation step
+    def step(self, deltatime: float):
+        if self.pending_turn is not None:
+            direction, timestamp = self.pending_turn
+            self.pending_turn = None
+            self.turn(direction)
+            self.manager.input.applied(timestamp)
+        player = self.player
+        player.update(deltatime)
+        # Until the first key press the player stands still, and nothing ever spawns next to it
+        if player.x != player.prev_x or player.y != player.prev_y:
+            self.collect()
+        # Hits before leaving the bounds still count
+        dead = player.outside()
+
+        # The body follows the head, running into it is just as deadly as the walls
+        if player.moving and not dead:
+            dead = self.body.advance(player.rect.centerx, player.rect.centery)
+            for rect in self.body.take_changes():
+                self.layer.changed(rect)
+
+        self.manager.get_score().update()
+        self.ticks += 1
+        if dead:
+            self.die()
+
+    # The run is stored before the death screen comes up, so the leaderboard it shows already has it
+    def die(self):
+        self.finish_run()
+        self.manager.set_scene("death")
+
+    # Detect collisions along the whole path of this step, a fast player would jump right over the
+    # collectible otherwise. Hits only count if they happened before running out of bounds.
+    def collect(self):
+        player = self.player
+        rect = player.rect
+        if len(self.collectibles) <= self.few:
+            candidates = self.collectibles
+        else:
+            path = self.path
+            prev_x, prev_y = int(player.prev_x), int(player.prev_y)
+            path.x, path.y = min(rect.x, prev_x), min(rect.y, prev_y)
+            path.width, path.height = abs(rect.x - prev_x) + rect.width, abs(rect.y - prev_y) + rect.height
+            candidates = self.grid.query(path)
+
+        hits = None
+        for collectible in candidates:
+            hit = player.sweep(collectible.rect)
+            if hit is None:
+                continue
+            if hits is None:
+                hits = []
+                exit_time = player.exit_time()
+            if exit_time is None or hit <= exit_time:
+                hits.append((hit, collectible))
+        if not hits:
+            return
+
+        # Collect in the order they were touched. Ties go by position, the spatial hash's order isn't the same
+        # from one process to the next and replays have to hand out the same random positions.
+        hits.sort(key=lambda pair: (pair[0], pair[1].x, pair[1].y))
+        self.spawner.exclude(rect)
+        for _, collectible in hits:
+            old_rect = collectible.rect.copy()
+            collectible.randomize_position(self.rng)
+            self.layer.moved(collectible, old_rect)
+            player.speed += self.speed_step
+            self.body.grow()
+            self.manager.audio.play(self.collect_sound)
+            self.manager.add_score()
+            self.triggers.update(self.manager.get_score().score)
+
+    def display_message(self, message):
+        self.displayed_message = message
+        self.message_text.text = message
+
+    def set_speed_step(self, speed_step: float):
+        self.speed_step = speed_step
+
+    # A wave of count more enemies, placed with the run's generator so replays get the same ones
+    def spawn(self, count: int):
+        wave = [Collectible(200, 200, self.sprites["entity"]) for _ in range(count)]
+        for collectible in wave:
+            collectible.grid = self.grid
+            collectible.spawner = self.spawner
+        self.spawner.exclude(self.player_area())
+        self.place(wave)
+        self.collectibles += wave
+        self.layer.invalidate()
+
+    # Where the player is, its rect only follows the position once the player has been updated. The same rect is
+    # handed out every time.
+    def player_area(self) -> pygame.Rect:
+        area, player = self.area, self.player
+        area.x, area.y = int(player.x), int(player.y)
+        area.width, area.height = player.rect.width, player.rect.height
+        return area
+
+    # Put collectibles down away from the player, more than one are spread out instead of landing in clumps. The
+    # spawner has to keep the player's area out already, start_run and spawn take care of that.
+    def place(self, collectibles: list):
+        if len(collectibles) == 1:
+            collectibles[0].randomize_position(self.rng)
+            return
+        for collectible, position in zip(collectibles, self.spawner.spread(self.rng, len(collectibles),
+                                                                           self.horde_spacing)):
+            collectible.set_position(*position)
+    
+
+    def render(self):
+        score = self.manager.get_score()
+        items = [("player", self.player.sprite, self.player.interpolated(self.alpha)),
+                 ("score", score.surface, (score.x, score.y))]
+
+        if self.displayed_message:
+            items.append(("message", self.message_text.surface, (self.message_text.x, self.message_text.y)))
+
+        areas = self.layer.flush(self.collectibles)
+        if areas is None:
+            # The whole layer was repainted, so all of it has to be scaled again too
+            self.renderer.invalidate()
+            areas = [self.layer.surface.get_rect()]
+        self.renderer.draw(self.layer.surface, items, areas)
+
+        
+    # Turns wait for the next step, so several presses in one frame always end up in the last one's direction
+    def handle_command(self, command: str, timestamp: float = None):
+        if command in DIRECTION_ANGLES:
+            self.pending_turn = (command, timestamp)
+
+    # Start moving in direction before the next step, every press goes into the recording
+    def turn(self, direction: str):
+        self.player.set_angle(DIRECTION_ANGLES[direction])
+        self.player.direction = direction
+        self.player.moving = True
+        self.recording.record(self.ticks, direction)
+
+    def get_score(self):
+        return self.manager.get_score()
+
+    # The first collectible, the only one outside of horde mode
+    @property
+    def collectible(self) -> Collectible:
+        return self.collectibles[0]
+
+
+# Start scene
+class StartScene(Scene):
+    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
+        super().__init__(manager, screen, sprites)
+        self.font = get_font(FONT_NAME, 36)
+        self.text = "Press SPACE to start!"
+        self.text_x = 400
+        self.text_y = 300
+
+    def update(self):
+        pass
+
+    def render(self):
+        text = self.text
+        if not self.manager.assets_ready():
+            text = f"Loading... {int(self.manager.loading_progress() * 100)}%"
+        self.renderer.draw(self.sprites["start-background"],
+                           [("text", render_text(FONT_NAME, 36, text, "white"), (self.text_x, self.text_y))])
+
+    def handle_command(self, command: str, timestamp: float = None):
+        if command == "start" and self.manager.assets_ready():
+            self.manager.set_scene("main")
+
+    # Keeps ticking at full rate while the loading progress is still changing
+    def is_idle(self) -> bool:
+        return self.manager.assets_ready()
+
+
+# Scene that plays upon death
+class DeathScene(Scene):
+    def __init__(self, manager: SceneManager, screen: pygame.Surface, sprites: dict):
+        super().__init__(manager, screen, sprites)
+        self.font = get_font(FONT_NAME, 36)
+        self.screen.fill("black")
+        self.text1 = "Press R to restart, or Q to exit game."
+        self.text1_x = 300
+        self.text1_y = 500
+        self.text2_x = 550
+        self.text2_y = 100
+        self.leaderboard = []
+        self.items = []
+        # Resolved along with the main scene, once the sounds are loaded, so dying never decodes anything
+        self.death_sound = None
+
+    def load_sounds(self):
+        self.death_sound = load_sound(*SOUNDS["death"])
+
+    # The death stinger plays once when the player dies, not on every frame of the death screen
+    def on_enter(self):
+        super().on_enter()
+        self.leaderboard = self.manager.top_scores(5)
+
+        # Nothing on the death screen changes while it's up, so every line is put together once right here
+        atlas = get_atlas(FONT_NAME, 36, "white")
+        self.items = [
+            ("text1", render_text(FONT_NAME, 36, self.text1, "#8B2323"), (self.text1_x, self.text1_y)),
+            ("score", atlas.compose(f"Score: {self.manager.get_score().score}"), (self.text2_x, self.text2_y)),
+            ("highscore", atlas.compose(f"Highscore: {self.manager.get_highscore()}"), (self.text2_x, self.text2_y + 50))
+        ] + [
+            (f"top{rank}", render_text(FONT_NAME, 24, f"{rank}. {player}  {score}", "white"), (self.text2_x, self.text2_y + 120 + rank * 35))
+            for rank, (player, score, _) in enumerate(self.leaderboard, 1)
+        ]
+        self.manager.audio.pause_music()
+        if self.death_sound is not None:
+            self.manager.audio.play(self.death_sound, "stinger", limit=1)
+        
+    def update(self):
+        pass
+
+    def render(self):
+        self.renderer.draw(self.sprites["death-background"], self.items)
+    
+    def handle_command(self, command: str, timestamp: float = None):
+        if command == "restart":
+            self.manager.reset_main()
+            self.manager.set_scene("main")
+        elif command == "quit":
+            self.manager.quit_game()
+
+    def is_idle(self) -> bool:
+        return True
+        
+
+# Splits the time until the first frame is on screen into phases, each one lasts from the previous mark to its own
+class StartupTimer:
+    def __init__(self, started: float = IMPORT_STARTED):
+        self.last = started
+        self.phases = {}
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = now - self.last
+        self.last = now
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def report(self) -> str:
+        phases = ", ".join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in self.phases.items())
+        return f"startup {self.total * 1000:.1f}ms ({phases})"
+
+
+# Game class with all according properties
+class Game:
+    # Render screen and initialize game
+    def __init__(self, target_fps: int = 60, headless: bool = False, profile_path: str = None, collectibles: int = 1,
+                 record_path: str = None, scores_path: str = None, player: str = "player", startup_report: bool = False,
+                 fullscreen: bool = False):
+        # Everything since the module was imported, parsing the command line included, counts as import
+        self.startup = StartupTimer()
+        self.startup.mark("import")
+        self.startup_report = startup_report
+        self.first_frame = True
+        self.headless = headless
+        self.profile_path = profile_path
+        self.collectibles = collectibles
+        self.record_path = record_path
+        if headless:
+            # Null video and audio drivers, no window is opened and no sound device is touched
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        # Only what the start screen needs, pygame.init() would also bring up the mixer and joysticks. The mixer
+        # starts with the first sound, see init_mixer.
+        pygame.display.init()
+        pygame.font.init()
+        self.running = True
+        self.pacer = FramePacer(target_fps)
+        self.profiler = FrameProfiler()
+        self.scene_manager = SceneManager()
+        self.scene_manager.input.setup()
+        self.scene_manager.profiler = self.profiler
+        self.scene_manager.player = player
+        if scores_path:
+            self.scene_manager.scores = ScoreStore(scores_path)
+
+        if headless:
+            # Nothing is ever drawn, so everything can be loaded right away
+            self.screen = pygame.Surface(Viewport.logical_size)
+            self.scene_manager.audio.muted = True
+            self.startup.mark("init")
+            self.sprites = self.load_sprites()
+            self.loader = None
+        else:
+            # Fullscreen takes the desktop's resolution, a window can be resized to anything. Scenes keep laying
+            # themselves out in 1280x720 and the viewport scales that to fit.
+            if fullscreen:
+                self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                self.screen = pygame.display.set_mode(Viewport.logical_size, pygame.RESIZABLE)
+            self.scene_manager.viewport = Viewport(self.screen)
+            self.display = pygame.display.set_caption("2D BOOM SNAKE")
+            self.icon = pygame.image.load("sprites/doom-guy.png")
+            pygame.display.set_icon(self.icon)
+            self.startup.mark("init")
+
+            # Only the start screen is loaded up front, everything else streams in while it is showing
+            self.sprites = {"start-background": load_image(*SPRITES["start-background"])}
+            self.loader = AssetLoader({key: spec for key, spec in SPRITES.items() if key not in self.sprites}, SOUNDS)
+            self.scene_manager.loader = self.loader
+            self.loader.start()
+
+        self.scenes = {
+            "start": StartScene(self.scene_manager, self.screen, self.sprites),
+            "death": DeathScene(self.scene_manager, self.screen, self.sprites)
+        } 
+        if headless:
+            self.scenes["main"] = self.make_main_scene()
+            self.scenes["death"].load_sounds()
+        self.scene_manager.initialize(self.scenes, "start")
+        self.startup.mark("assets")
+
+    # Install the background loaded assets and build the scene that needs them
+    def finish_loading(self):
+        self.sprites.update(self.loader.finish())
+        self.loader = None
+        self.scene_manager.loader = None
+
+        self.scene_manager.audio.play_music("sfx/Eternal.mp3", 0.25)
+
+        self.scenes["main"] = self.make_main_scene()
+        self.scenes["death"].load_sounds()
+
+    def make_main_scene(self, collectibles: int = None, seed: int = None) -> MainScene:
+        scene = MainScene(self.scene_manager, self.screen, self.sprites, collectibles or self.collectibles, seed)
+        scene.record_path = self.record_path
+        return scene
+
+
+    # Run game
+    def run(self):
+        while self.running:
+            if self.loader and self.loader.done:
+                self.finish_loading()
+
+            self.profiler.measure("events", self.handle_input)
+            self.profiler.measure("update", self.scene_manager.current_scene.update)
+            self.profiler.measure("render", self.scene_manager.current_scene.render)
+            if self.profiler.overlay:
+                self.profiler.draw(pygame.display.get_surface() or self.screen,
+                                   type(self.scene_manager.current_scene).__name__)
+            if self.first_frame:
+                self.first_frame = False
+                self.startup.mark("first_frame")
+                # Opening the audio device takes a while, the start screen is already up by now
+                if self.loader:
+                    self.loader.start_mixer()
+                if self.startup_report:
+                    print(self.startup.report())
+        
+            if self.scene_manager.quit == True:
+                self.running = False
+
+            self.pacer.tick(self.scene_manager.current_scene.is_idle())
+            self.profiler.end_frame(type(self.scene_manager.current_scene).__name__)
+
+        if self.profile_path:
+            self.profiler.export(self.profile_path, {"input_latency": self.scene_manager.input.latency()})
+        if self.scene_manager.scores is not None:
+            self.scene_manager.scores.close()
+        pygame.quit()
+
+    def handle_input(self):
+        self.scene_manager.input.poll()
+        self.scene_manager.current_scene.poll_events()
+
+    # Step the main scene as fast as possible with scripted input, restarting after every death
+    def run_headless(self, ticks: int, script: dict = None) -> dict:
+        script = script or {}
+        scene = self.scenes["main"]
+        self.scene_manager.set_scene("main")
+        deaths = 0
+
+        start = time.perf_counter()
+        for tick in range(ticks):
+            for key in script.get(tick, ()):
+                scene.handle_command(InputSystem.bindings.get(key))
+            scene.step(scene.step_time)
+
+            if self.scene_manager.current_scene is not scene:
+                deaths += 1
+                self.scene_manager.reset_main()
+                self.scene_manager.set_scene("main")
+        elapsed = time.perf_counter() - start
+
+        return {"ticks": ticks,
+                "seconds": elapsed,
+                "ticks_per_second": ticks / elapsed if elapsed else float("inf"),
+                "simulated_seconds": ticks * scene.step_time,
+                "deaths": deaths,
+                "highscore": self.scene_manager.get_highscore()}
+
+    # Play a recorded run again as fast as possible, checking it ends exactly like the original did
+    def replay(self, recording: InputRecording) -> dict:
+        scene = self.make_main_scene(recording.collectibles, recording.seed)
+        scene.record_path = None
+        self.scenes["main"] = scene
+        self.scene_manager.get_score().score = 0
+        self.scene_manager.set_scene("main")
+        presses = recording.presses()
+        next_press = 0
+
+        start = time.perf_counter()
+        while scene.ticks < recording.ticks and self.scene_manager.current_scene is scene:
+            while next_press < len(presses) and presses[next_press][0] == scene.ticks:
+                scene.turn(presses[next_press][1])
+                next_press += 1
+            scene.step(scene.step_time)
+        elapsed = time.perf_counter() - start
+
+        simulated = scene.ticks * scene.step_time
+        return {"ticks": scene.ticks,
+                "score": self.scene_manager.get_score().score,
+                "seconds": elapsed,
+                "speedup": simulated / elapsed if elapsed else float("inf"),
+                # The replay's own recording has to come out byte for byte the same as the original
+                "verified": scene.recording.to_bytes() == recording.to_bytes()}
+
+    # Load sprites
+    def load_sprites(self) -> dict:
+        return {key: load_image(path, size) for key, (path, size) in SPRITES.items()}
+
+
+# Turn "0:d,300:w" into {0: [K_d], 300: [K_w]} for scripted headless input
+def parse_script(script: str) -> dict:
+    keys = {}
+    for entry in filter(None, script.split(",")):
+        tick, name = entry.split(":")
+        keys.setdefault(int(tick), []).append(pygame.key.key_code(name))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="2D BOOM SNAKE")
+    parser.add_argument("--fps", type=int, default=60, help="target frame rate")
+    parser.add_argument("--headless", action="store_true", help="simulate without a window or audio and report ticks per second")
+    parser.add_argument("--ticks", type=int, default=100000, help="simulation ticks for --headless")
+    parser.add_argument("--script", default="", help="scripted input for --headless, e.g. 0:d,300:w")
+    parser.add_argument("--profile", metavar="PATH", help="write frame timings to a .csv or .json file on exit")
+    parser.add_argument("--horde", type=int, default=1, metavar="N", help="number of enemies on screen at once")
+    parser.add_argument("--record", metavar="PATH", help="save the input of every run to PATH when it ends")
+    parser.add_argument("--replay", metavar="PATH", help="play a recorded run again without a window and verify it")
+    parser.add_argument("--player", default="player", help="name your runs are saved under")
+    parser.add_argument("--scores", default="scores.db", metavar="PATH", help="database that keeps every run")
+    parser.add_argument("--fullscreen", action="store_true", help="play fullscreen at the desktop's resolution")
+    parser.add_argument("--startup", action="store_true", help="print how long it took to get the first frame on screen")
+    args = parser.parse_args()
+
+    if args.replay:
+        game = Game(headless=True)
+        report = game.replay(InputRecording.load(args.replay))
+        for name, value in report.items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+        sys.exit(0 if report["verified"] else 1)
+
+    if args.headless:
+        game = Game(args.fps, headless=True, collectibles=args.horde, record_path=args.record)
+        script = parse_script(args.script)
+        report = game.run_headless(args.ticks, script)
+        for name, value in report.items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+        return
+
+    game = Game(args.fps, profile_path=args.profile, collectibles=args.horde, record_path=args.record,
+                scores_path=args.scores, player=args.player, startup_report=args.startup, fullscreen=args.fullscreen)
+    game.run()
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
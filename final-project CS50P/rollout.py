@@ -0,0 +1,134 @@
+import os, time, argparse
+import multiprocessing
+import numpy as np
+from project import MainScene, load_triggers
+from batch_env import BatchEnv, NOOP, UP, RIGHT, DOWN, LEFT
+
+
+# Presses a random direction now and then
+def random_policy(env: BatchEnv, rng: np.random.Generator) -> np.ndarray:
+    turning = rng.random(env.games) < 0.05
+    return np.where(turning, rng.integers(UP, LEFT + 1, env.games), NOOP).astype(np.int8)
+
+
+# Heads straight for the collectible, first lining up horizontally and then vertically
+def greedy_policy(env: BatchEnv, rng: np.random.Generator) -> np.ndarray:
+    dx = (env.collectible_x + env.collectible_size / 2) - (env.x + env.width / 2)
+    dy = (env.collectible_y + env.collectible_size / 2) - (env.y + env.height / 2)
+    horizontal = np.abs(dx) > env.collectible_size / 4
+    return np.where(horizontal, np.where(dx > 0, RIGHT, LEFT), np.where(dy > 0, DOWN, UP)).astype(np.int8)
+
+
+POLICIES = {"random": random_policy, "greedy": greedy_policy}
+
+
+# Milestone messages from the trigger file by the score they show up at
+def milestones() -> dict:
+    return {score: value for score, kind, value in load_triggers() if kind == "message"}
+
+
+# Result buffers shared by every worker, each chunk writes its own slice
+shared_scores = None
+shared_steps = None
+
+
+def init_worker(scores, steps):
+    global shared_scores, shared_steps
+    shared_scores = scores
+    shared_steps = steps
+
+
+# Play one chunk of games until each of them died once, or max_steps ran out. The chunk's seed only depends on
+# its position, so the results are the same no matter which worker runs it.
+def run_chunk(task: tuple) -> int:
+    start, count, policy, seed, max_steps = task
+    rng = np.random.default_rng([seed, start])
+    env = BatchEnv(count, seed=rng.integers(2 ** 63))
+    choose = POLICIES[policy]
+    scores = np.frombuffer(shared_scores, np.int64)[start:start + count]
+    steps = np.frombuffer(shared_steps, np.int64)[start:start + count]
+    finished = np.zeros(count, bool)
+
+    total = 0
+    for _ in range(max_steps):
+        _, died = env.step(choose(env, rng))
+        total += count
+        first = died & ~finished
+        if first.any():
+            scores[first] = env.final_score[first]
+            steps[first] = env.final_steps[first]
+            finished |= first
+            if finished.all():
+                break
+
+    # Games that survived the whole time count with what they had so far
+    scores[~finished] = env.score[~finished]
+    steps[~finished] = env.steps[~finished]
+    return total
+
+
+# Play episodes games with policy across a pool of workers, returns the score and survived steps of every game
+def rollout(episodes: int, policy: str = "greedy", workers: int = None, seed: int = 0, chunk_size: int = 1024,
+            max_steps: int = 120 * 300) -> tuple:
+    # Workers are always spawned fresh, forking a process that already runs SDL's threads can deadlock
+    context = multiprocessing.get_context("spawn")
+    scores = context.Array("q", episodes, lock=False)
+    steps = context.Array("q", episodes, lock=False)
+    tasks = [(start, min(chunk_size, episodes - start), policy, seed, max_steps)
+             for start in range(0, episodes, chunk_size)]
+
+    started = time.perf_counter()
+    if workers == 1:
+        init_worker(scores, steps)
+        total = sum(map(run_chunk, tasks))
+    else:
+        with context.Pool(workers, init_worker, (scores, steps)) as pool:
+            total = sum(pool.imap_unordered(run_chunk, tasks))
+    seconds = time.perf_counter() - started
+
+    return (np.frombuffer(scores, np.int64).copy(), np.frombuffer(steps, np.int64).copy(),
+            {"seconds": seconds, "steps": total, "steps_per_second": total / seconds})
+
+
+# Aggregate statistics of a rollout, including how many games reached each milestone. The batch environment doesn't
+# simulate the snake's body, so games never end by running into it: scores and survival times are an upper bound
+# of what the same bot would get in the real game.
+def summarize(scores: np.ndarray, steps: np.ndarray, step_time: float = MainScene.step_time) -> dict:
+    survived = steps * step_time
+    return {
+        "episodes": len(scores),
+        "score_mean": float(scores.mean()),
+        "score_median": float(np.median(scores)),
+        "score_p90": float(np.percentile(scores, 90)),
+        "score_max": int(scores.max()),
+        "survived_mean_s": float(survived.mean()),
+        "survived_p90_s": float(np.percentile(survived, 90)),
+        "milestones": {milestone: float(np.mean(scores >= milestone)) for milestone in sorted(milestones())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a bot policy over many headless games")
+    parser.add_argument("--episodes", type=int, default=10000, help="number of games to play")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy", help="bot that plays the games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the whole rollout")
+    parser.add_argument("--chunk", type=int, default=1024, help="games per unit of work")
+    parser.add_argument("--max-steps", type=int, default=120 * 300, help="steps before a game is cut off")
+    args = parser.parse_args()
+
+    scores, steps, timing = rollout(args.episodes, args.policy, args.workers, args.seed, args.chunk, args.max_steps)
+    stats = summarize(scores, steps)
+    print(f"{stats['episodes']} games with {args.policy} on {args.workers} workers in {timing['seconds']:.2f}s "
+          f"({timing['steps_per_second'] / 1e6:.1f}M steps/s)")
+    print(f"score mean {stats['score_mean']:.2f}, median {stats['score_median']:.0f}, "
+          f"p90 {stats['score_p90']:.0f}, max {stats['score_max']}")
+    print(f"survived mean {stats['survived_mean_s']:.1f}s, p90 {stats['survived_p90_s']:.1f}s")
+    print("Without the snake's body nothing dies from running into itself, real games end sooner than this")
+    messages = milestones()
+    for milestone, reached in stats["milestones"].items():
+        print(f"{milestone:>4} {messages[milestone]:<28}{reached:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import numpy as np
+from project import MainScene, SpawnSampler
+from batch_env import BatchEnv, NOOP, UP, RIGHT, DOWN, LEFT
+from test_project import make_main_scene
+
+
+# The batch environment moves, collects and dies at the walls exactly like the main scene when given the same
+# input. The snake's body is left out: the batch environment has none, and this run never grows the body past
+# the neck, so deaths from running into it aren't covered.
+def test_batch_env_matches_main_scene():
+    main_scene = make_main_scene()
+    deaths = []
+    main_scene.manager.set_scene = deaths.append
+    main_scene.manager.audio.muted = True
+    env = BatchEnv(1)
+    commands = {UP: "up", RIGHT: "right", DOWN: "down", LEFT: "left"}
+
+    def place_collectible(x, y):
+        main_scene.collectible.set_position(x, y)
+        env.collectible_x[0], env.collectible_y[0] = x, y
+
+    place_collectible(800, 280)
+    actions = {0: RIGHT, 90: DOWN, 150: LEFT, 170: UP}
+    for tick in range(2000):
+        action = actions.get(tick, NOOP)
+        if action != NOOP:
+            main_scene.handle_command(commands[action])
+        score = main_scene.get_score().score
+        main_scene.step(MainScene.step_time)
+        collected, died = env.step(np.array([action]))
+
+        assert collected[0] == (main_scene.get_score().score > score)
+        if collected[0]:
+            place_collectible(100, 600)
+        if died[0]:
+            break
+        assert (env.x[0], env.y[0]) == (main_scene.player.x, main_scene.player.y)
+        assert env.speed[0] == main_scene.player.speed
+
+    assert deaths == ["death"]
+    assert env.final_score[0] == main_scene.get_score().score == 1
+
+
+# Standing on a collectible before the first key press doesn't collect it, in either of them
+def test_batch_env_still_player_collects_nothing():
+    main_scene = make_main_scene()
+    main_scene.manager.audio.muted = True
+    env = BatchEnv(1)
+    main_scene.collectible.set_position(590, 290)
+    env.collectible_x[0], env.collectible_y[0] = 590, 290
+
+    for _ in range(10):
+        main_scene.step(MainScene.step_time)
+        collected, died = env.step(np.array([NOOP]))
+        assert not collected[0] and not died[0]
+    assert main_scene.get_score().score == 0
+
+
+def test_batch_env_spawns_away_from_player():
+    env = BatchEnv(10000, seed=1)
+    gap, size = SpawnSampler.exclusion, env.collectible_size
+    near = ((env.collectible_x < env.x + env.width + gap) & (env.collectible_x + size > env.x - gap) &
+            (env.collectible_y < env.y + env.height + gap) & (env.collectible_y + size > env.y - gap))
+    assert not near.any()
+    collected, _ = env.step(np.zeros(env.games, np.int8))
+    assert not collected.any()
+
+
+def test_batch_env_resets_only_dead_games():
+    env = BatchEnv(3, seed=1)
+    env.collectible_x[:], env.collectible_y[:] = 1100, 600
+    env.step(np.array([DOWN, UP, NOOP]))
+    for _ in range(200):
+        _, died = env.step(np.zeros(3, np.int8))
+        if died[1]:
+            break
+    # The game heading up dies first and starts over, the others keep going
+    assert died.tolist() == [False, True, False]
+    assert env.y[1] == BatchEnv.start[1] and env.direction[1] == NOOP
+    assert env.direction[0] == DOWN
+    assert env.final_steps[1] > 0 and env.final_score[0] == -1
@@ -1,63 +1,728 @@
-from project import StartScene, DeathScene, Player, Collectible, SceneManager, Score, MainScene
-import pygame
-import pytest
-pygame.font.init()
-
-
-# Player class tests
-def test_move():
-    player = Player(100, 100, pygame.Surface((10, 10)), None)
-    player.direction = "up"
-    player.move(0.1)
-
-    assert player.x == 100
-    assert player.y < 100
-
-def test_collision():
-    player = Player(100, 100, pygame.Surface((10, 10)), None)
-    collectible = Collectible(105, 105, pygame.Surface((10, 10)))
-
-    player.direction = "right"
-
-    assert player.rect.colliderect(collectible.rect)
-
-
-def test_set_angle():
-    player = Player(100, 100, pygame.Surface((10, 10)), None)
-    player.set_angle(90)
-    assert player.angle == 90
-
-    player.set_angle(180)
-    assert player.angle == 180
-
-
-# Start scene class test
-def test_start_scene_init():
-    scene_manager = SceneManager()
-    start_scene = StartScene(scene_manager, pygame.Surface((800, 600)), {})
-    assert start_scene.manager == scene_manager
-
-
-# Death scene class test
-def test_death_scene_initialization():
-    scene_manager = SceneManager()
-    death_scene = DeathScene(scene_manager, pygame.Surface((800, 600)), {})
-    assert death_scene.manager == scene_manager
-    assert death_scene.manager.get_score().score == 0
-
-
-# Score class test
-def test_score_initialization():
-    score = Score(600, 80)
-    assert score.score == 0
-
-def test_add_score():
-    score = Score(600, 80)
-    score.add_score()
-    assert score.score == 1
-
-def test_update_score():
-    score = Score(600, 80)
-    score.score = 10
-    score.update()
-    assert score.text == "10"
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from project import Viewport, SpawnSampler, TriggerEngine, load_triggers, InputSystem, init_mixer, get_atlas, FONT_NAME, ScoreStore, InputRecording, SnakeBody, StartScene, DeathScene, Player, Collectible, SceneManager, Score, MainScene, FramePacer, Text, get_font, DirtyRenderer, load_image, has_alpha, AssetLoader, AudioManager, Game, parse_script, FrameProfiler, swept_collision, SpatialHash, EntityLayer
+import pygame
+import pytest
+import random
+import math
+import time
+import threading
+import wave
+pygame.mixer.init()
+pygame.font.init()
+
+
+# Player class tests
+def test_move():
+    player = Player(100, 100, pygame.Surface((10, 10)), None)
+    player.direction = "up"
+    player.move(0.1)
+
+    assert player.x == 100
+    assert player.y < 100
+
+def test_collision():
+    player = Player(100, 100, pygame.Surface((10, 10)), None)
+    collectible = Collectible(105, 105, pygame.Surface((10, 10)))
+
+    player.direction = "right"
+
+    assert player.rect.colliderect(collectible.rect)
+
+
+def test_set_angle():
+    player = Player(100, 100, pygame.Surface((10, 10)), None)
+    player.set_angle(90)
+    assert player.angle == 90
+
+    player.set_angle(180)
+    assert player.angle == 180
+
+def test_set_angle_uses_cached_rotations():
+    player = Player(100, 100, pygame.Surface((60, 52)), None)
+    upright = player.sprite
+    for angle in (90, 180, 270, 0) * 10:
+        player.set_angle(angle)
+    assert player.sprite is upright
+    assert player.sprite.get_size() == (60, 52)
+    assert (player.x, player.y) == (100, 100)
+
+    player.set_angle(90)
+    assert player.rect.size == (52, 60)
+    assert player.rect.center == (130, 126)
+
+
+def test_player_interpolation():
+    player = Player(100, 100, pygame.Surface((10, 10)), None)
+    player.direction = "right"
+    player.moving = True
+    player.update(0.1)
+    assert player.interpolated(0.0) == (100, 100)
+    assert player.interpolated(0.5) == (110, 100)
+
+
+def make_main_scene(collectibles=1):
+    scene_manager = SceneManager()
+    sprites = {"doom": pygame.Surface((60, 52)), "entity": pygame.Surface((80, 80)),
+               "background": pygame.Surface((1280, 720))}
+    main_scene = MainScene(scene_manager, pygame.Surface((1280, 720)), sprites, collectibles)
+    scene_manager.initialize({"main": main_scene}, "main")
+    return main_scene
+
+
+# Main scene class test
+def test_main_scene_fixed_steps():
+    main_scene = make_main_scene()
+    steps = []
+    main_scene.step = steps.append
+    main_scene.previous_time = time.perf_counter() - 0.1
+    main_scene.update()
+    assert len(steps) >= 12
+    assert set(steps) == {MainScene.step_time}
+    assert 0 <= main_scene.alpha < 1
+
+
+def test_reset_main_reuses_scene():
+    main_scene = make_main_scene()
+    scene_manager = main_scene.manager
+    main_scene.player.speed = 500
+    main_scene.player.set_angle(90)
+    main_scene.display_message("Penta Kill!")
+    scene_manager.add_score()
+
+    scene_manager.reset_main()
+    assert scene_manager.scenes["main"] is main_scene
+    assert main_scene.player.speed == 200
+    assert main_scene.player.angle == 0
+    assert main_scene.displayed_message is None
+    assert scene_manager.get_score().text == "0"
+    assert scene_manager.get_highscore() == 1
+
+
+# Audio manager tests
+def test_audio_voice_limit():
+    audio = AudioManager()
+    sound = pygame.mixer.Sound(buffer=bytes(44100 * 4))
+    assert audio.play(sound)
+    assert audio.play(sound)
+    assert not audio.play(sound)
+    assert audio.active_voices()["sfx"] == 2
+    assert (audio.played, audio.dropped) == (2, 1)
+
+    assert audio.play(sound, "stinger", limit=1)
+    assert not audio.play(sound, "stinger", limit=1)
+    pygame.mixer.stop()
+
+
+# Frame profiler tests
+def test_profiler_ring_buffer():
+    profiler = FrameProfiler(size=10)
+    for _ in range(25):
+        profiler.measure("update", lambda: None)
+        profiler.end_frame("MainScene")
+    assert profiler.count == 10
+    assert len(profiler.frame_indexes()) == 10
+    summary = profiler.summary()
+    assert summary["frame"]["p50"] <= summary["frame"]["p99"]
+
+# Long after the ring buffer filled up the overlay still only gets new text every refresh_every frames
+def test_profiler_overlay_refreshes_periodically():
+    profiler = FrameProfiler(size=10)
+    screen = pygame.display.set_mode((1280, 720))
+    refreshes = 0
+    for _ in range(300):
+        lines = profiler.overlay_lines
+        profiler.draw(screen)
+        refreshes += profiler.overlay_lines is not lines
+        profiler.end_frame("MainScene")
+    assert refreshes == 300 // FrameProfiler.refresh_every
+
+# A slow scene doesn't show up in the numbers of a fast one
+def test_profiler_summarizes_each_scene():
+    profiler = FrameProfiler(size=10)
+    screen = pygame.display.set_mode((1280, 720))
+    for scene, seconds in [("StartScene", 0.1)] * 5 + [("MainScene", 0.001)] * 5:
+        profiler.timings["update"][profiler.index] = seconds
+        profiler.end_frame(scene)
+    assert profiler.summary("MainScene")["update"]["p99"] == pytest.approx(1.0)
+    assert profiler.summary("StartScene")["update"]["p50"] == pytest.approx(100.0)
+    assert list(profiler.scene_summaries()) == ["StartScene", "MainScene"]
+    profiler.draw(screen, "MainScene")
+    assert "MainScene" in profiler.overlay_header
+    assert profiler.overlay_lines[1].split()[1:] == ["1.00", "1.00", "1.00"]
+
+def test_profiler_export(tmp_path):
+    profiler = FrameProfiler(size=10)
+    profiler.end_frame("StartScene")
+    profiler.export(str(tmp_path / "frames.csv"))
+    profiler.export(str(tmp_path / "frames.json"))
+    assert (tmp_path / "frames.csv").read_text().startswith("scene,events_ms")
+    assert "summary" in (tmp_path / "frames.json").read_text()
+
+
+# Headless mode tests
+def test_parse_script():
+    pygame.init()
+    assert parse_script("0:d,300:w,300:a") == {0: [pygame.K_d], 300: [pygame.K_w, pygame.K_a]}
+    assert parse_script("") == {}
+
+def test_startup_phases():
+    game = Game(headless=True)
+    assert list(game.startup.phases) == ["import", "init", "assets"]
+    assert game.startup.total == sum(game.startup.phases.values())
+    assert game.startup.report().startswith("startup ")
+
+def test_mixer_starts_on_demand():
+    pygame.mixer.quit()
+    assert init_mixer()
+    assert pygame.mixer.get_init()
+
+def test_run_headless():
+    game = Game(headless=True)
+    report = game.run_headless(1000, {0: [pygame.K_d]})
+    assert report["ticks"] == 1000
+    assert report["ticks_per_second"] > 0
+    assert report["deaths"] == 1
+    assert game.scene_manager.get_scene() is game.scenes["main"]
+
+
+# Recording and replay tests
+def test_recording_round_trip():
+    recording = InputRecording(2 ** 64 - 1, collectibles=3)
+    recording.record(0, "right")
+    recording.record(480, "up")
+    recording.finish(900, 7)
+    loaded = InputRecording.from_bytes(recording.to_bytes())
+    assert (loaded.seed, loaded.collectibles, loaded.ticks, loaded.score) == (2 ** 64 - 1, 3, 900, 7)
+    assert loaded.presses() == [(0, "right"), (480, "up")]
+    assert len(recording.to_bytes()) == 24 + 2 * 5
+    with pytest.raises(ValueError):
+        InputRecording.from_bytes(bytes(24))
+
+
+def test_replay_reproduces_run(tmp_path):
+    path = str(tmp_path / "run.bsr")
+    game = Game(headless=True, collectibles=50, record_path=path)
+    game.run_headless(5000, {0: [pygame.K_d], 120: [pygame.K_s], 240: [pygame.K_a], 300: [pygame.K_w]})
+    recording = InputRecording.load(path)
+    assert recording.ticks > 0
+
+    report = Game(headless=True).replay(recording)
+    assert report["verified"]
+    assert (report["ticks"], report["score"]) == (recording.ticks, recording.score)
+
+
+# Score store tests
+def test_score_store_top_scores(tmp_path):
+    path = str(tmp_path / "scores.db")
+    store = ScoreStore(path)
+    for player, score in [("ann", 3), ("bob", 12), ("ann", 7), ("bob", 1)]:
+        store.submit(player, score, score * 100)
+    # Runs that are still waiting to be written count too
+    assert [row[1] for row in store.top(3)] == [12, 7, 3]
+    store.flush()
+    assert store.written == 4
+    assert store.top(5, "ann") == [("ann", 7, 700), ("ann", 3, 300)]
+    store.close()
+
+    reopened = ScoreStore(path)
+    assert reopened.top(1) == [("bob", 12, 1200)]
+    reopened.close()
+
+
+# While the writer is stuck in a commit, submitting and reading the top runs don't wait for it
+def test_score_store_commits_outside_the_lock(tmp_path):
+    inserting, release = threading.Event(), threading.Event()
+
+    def trace(statement):
+        if statement.startswith("INSERT"):
+            inserting.set()
+            release.wait(5)
+
+    class SlowStore(ScoreStore):
+        def connect(self):
+            connection = super().connect()
+            connection.set_trace_callback(trace)
+            return connection
+
+    store = SlowStore(str(tmp_path / "scores.db"))
+    store.submit("ann", 3, 300)
+    assert inserting.wait(5)
+    start = time.perf_counter()
+    store.submit("bob", 5, 500)
+    assert store.top(5) == [("bob", 5, 500), ("ann", 3, 300)]
+    assert time.perf_counter() - start < 1
+    release.set()
+    store.flush()
+    assert store.top(5) == [("bob", 5, 500), ("ann", 3, 300)]
+    store.close()
+
+
+def test_death_scene_shows_stored_highscore(tmp_path):
+    game = Game(headless=True, scores_path=str(tmp_path / "scores.db"), player="ann")
+    game.scene_manager.scores.submit("bob", 40, 100)
+    game.run_headless(1000, {0: [pygame.K_d]})
+    # The death screen came up once, with the run that just ended already on it
+    leaderboard = game.scenes["death"].leaderboard
+    assert leaderboard[0] == ("bob", 40, 100)
+    assert [row[0] for row in leaderboard] == ["bob", "ann"]
+    assert game.scene_manager.get_highscore() == 40
+    game.scene_manager.scores.flush()
+    assert game.scene_manager.scores.top(5, "ann")[0][0] == "ann"
+    game.scene_manager.scores.close()
+
+
+# Swept collision tests
+def test_swept_collision():
+    target = pygame.Rect(200, 100, 80, 80)
+    assert swept_collision(100, 100, 10, 10, 300, 0, target) == pytest.approx(90 / 300)
+    assert swept_collision(100, 100, 10, 10, 50, 0, target) is None
+    assert swept_collision(100, 300, 10, 10, 300, 0, target) is None
+    assert swept_collision(210, 110, 10, 10, 0, 0, target) == 0
+
+def test_fast_player_does_not_tunnel():
+    main_scene = make_main_scene()
+    player = main_scene.player
+    player.x, player.y = 100, 300
+    player.direction = "right"
+    player.moving = True
+    player.speed = 30000
+    main_scene.collectible.set_position(250, 300)
+
+    main_scene.step(MainScene.step_time)
+    assert main_scene.get_score().score == 1
+
+def test_collectible_past_the_wall_is_missed():
+    main_scene = make_main_scene()
+    main_scene.manager.scenes["death"] = DeathScene(main_scene.manager, pygame.Surface((1280, 720)), {})
+    player = main_scene.player
+    player.x, player.y = 1100, 300
+    player.direction = "right"
+    player.moving = True
+    player.speed = 30000
+    main_scene.collectible.set_position(1330, 300)
+
+    main_scene.step(MainScene.step_time)
+    assert main_scene.get_score().score == 0
+    assert main_scene.manager.get_scene() is main_scene.manager.scenes["death"]
+
+
+# Horde mode tests
+def test_spatial_hash():
+    grid = SpatialHash(cell_size=64)
+    collectible = Collectible(0, 0, pygame.Surface((80, 80)))
+    collectible.grid = grid
+    collectible.set_position(100, 100)
+    grid.insert(collectible)
+    assert grid.query(pygame.Rect(150, 150, 10, 10)) == {collectible}
+
+    collectible.set_position(1000, 500)
+    assert grid.query(pygame.Rect(150, 150, 10, 10)) == set()
+    assert grid.query(pygame.Rect(1010, 510, 10, 10)) == {collectible}
+
+def test_milestone_shows_when_reached():
+    main_scene = make_main_scene()
+    main_scene.get_score().score = 4
+    player = main_scene.player
+    player.x, player.y = 100, 300
+    player.direction = "right"
+    player.moving = True
+    main_scene.collectible.set_position(120, 300)
+
+    main_scene.step(MainScene.step_time)
+    assert main_scene.displayed_message == "Penta Kill!"
+
+
+# Spawn sampler tests
+def test_spawns_stay_on_screen_and_away_from_player():
+    sampler = SpawnSampler()
+    rng = random.Random(3)
+    player = pygame.Rect(600, 300, 60, 52)
+    sampler.exclude(player)
+    for _ in range(500):
+        x, y = sampler.sample(rng)
+        enemy = pygame.Rect(x, y, 80, 80)
+        assert pygame.Rect(0, 0, 1280, 720).contains(enemy)
+        assert not enemy.colliderect(player.inflate(2 * SpawnSampler.exclusion, 2 * SpawnSampler.exclusion))
+
+def test_exclusion_follows_player():
+    sampler = SpawnSampler()
+    sampler.exclude(pygame.Rect(100, 100, 60, 52))
+    sampler.exclude(pygame.Rect(900, 400, 60, 52))
+    fresh = SpawnSampler()
+    fresh.exclude(pygame.Rect(900, 400, 60, 52))
+    assert sorted(sampler.cells[:sampler.count]) == sorted(fresh.cells[:fresh.count])
+    assert all(sampler.slots[cell] == slot for slot, cell in enumerate(sampler.cells[:sampler.count]))
+
+def test_spread_keeps_enemies_apart():
+    sampler = SpawnSampler()
+    free = sampler.count
+    positions = sampler.spread(random.Random(5), 12, 120)
+    assert sampler.count == free
+    for i, (x1, y1) in enumerate(positions):
+        for x2, y2 in positions[i + 1:]:
+            assert math.hypot(x1 - x2, y1 - y2) > 80
+
+
+# Trigger tests
+def test_triggers_fire_once_in_order():
+    fired = []
+    engine = TriggerEngine([(10, "message", "b"), (5, "message", "a"), (10, "speed", 75), (20, "message", "c")],
+                           {"message": fired.append})
+    engine.update(4)
+    assert fired == [] and engine.next == 5
+    engine.update(12)
+    assert fired == ["a", "b"] and engine.next == 20
+    engine.update(12)
+    assert fired == ["a", "b"]
+    engine.reset()
+    engine.update(5)
+    assert fired == ["a", "b", "a"]
+
+def test_trigger_file_has_milestones():
+    assert (5, "message", "Penta Kill!") in load_triggers()
+
+def test_spawn_wave_goes_away_on_reset():
+    main_scene = make_main_scene()
+    main_scene.spawn(3)
+    main_scene.set_speed_step(80)
+    assert len(main_scene.collectibles) == 4
+    assert len(main_scene.grid.entity_cells) == 4
+
+    main_scene.reset()
+    assert len(main_scene.collectibles) == 1
+    assert len(main_scene.grid.entity_cells) == 1
+    assert main_scene.speed_step == 50
+
+    # The run after it places its enemies just like a fresh scene with the same seed
+    main_scene.spawn(3)
+    main_scene.reset(seed=7)
+    fresh = make_main_scene()
+    fresh.reset(seed=7)
+    assert main_scene.collectible.rect == fresh.collectible.rect
+
+
+def test_horde_collects_everything_in_the_way():
+    main_scene = make_main_scene(collectibles=50)
+    for i, collectible in enumerate(main_scene.collectibles):
+        collectible.set_position(100 + i * 1000, 600)
+    main_scene.collectibles[1].set_position(300, 300)
+    main_scene.collectibles[2].set_position(500, 300)
+    player = main_scene.player
+    player.x, player.y = 100, 300
+    player.direction = "right"
+    player.moving = True
+    player.speed = 60000
+
+    main_scene.step(MainScene.step_time)
+    assert main_scene.get_score().score == 2
+    assert player.speed == 60100
+
+
+# Too many moves for one frame are repainted as the tiles they touched plus the moved sprites drawn on top, and
+# end up just like repainting everything
+def test_entity_layer_coalesces_many_changes():
+    background = pygame.Surface((1280, 720))
+    background.fill("gray")
+    sprite = pygame.Surface((10, 10))
+    sprite.fill("red")
+    grid = SpatialHash()
+    entities = []
+    for i in range(200):
+        entity = Collectible(0, 0, sprite)
+        entity.grid = grid
+        entity.set_position(20 * (i % 50), 20 * (i // 50))
+        entities.append(entity)
+    layer = EntityLayer(background, grid)
+    layer.flush(entities)
+
+    for entity in entities[:150]:
+        old_rect = entity.rect.copy()
+        entity.set_position(entity.rect.x, entity.rect.y + 400)
+        layer.moved(entity, old_rect)
+    areas = layer.flush(entities)
+    # One run of tiles where they were and one where they went, instead of 300 separate areas
+    assert len(areas) == 2
+    assert all(entity.rect.collidelist(areas) != -1 for entity in entities[:150])
+
+    fresh = EntityLayer(background, grid)
+    fresh.flush(entities)
+    assert pygame.image.tostring(layer.surface, "RGB") == pygame.image.tostring(fresh.surface, "RGB")
+
+
+def test_snake_body_follows_and_retires_its_tail():
+    body = SnakeBody(capacity=16)
+    for _ in range(3):
+        body.grow()
+    for x in range(0, 1000, 5):
+        assert not body.advance(x, 300)
+    # Only the three segments behind the neck are in the grid, even after the ring buffer wrapped around
+    assert sum(body.occupancy) == 3
+    assert body.occupied(995 - (SnakeBody.neck + 1) * SnakeBody.spacing, 300)
+    assert not body.occupied(995 - (SnakeBody.neck + 4) * SnakeBody.spacing, 300)
+
+
+def test_snake_dies_running_into_its_body():
+    main_scene = make_main_scene()
+    main_scene.collectible.set_position(100, 600)
+    for _ in range(20):
+        main_scene.body.grow()
+    deaths = []
+    main_scene.manager.set_scene = deaths.append
+    player = main_scene.player
+    player.moving = True
+    # Go round in a square and cross the first leg again
+    for direction, steps in [("right", 60), ("down", 60), ("left", 30), ("up", 90)]:
+        player.direction = direction
+        for _ in range(steps):
+            main_scene.step(MainScene.step_time)
+        assert not deaths or direction == "up"
+    assert deaths[0] == "death"
+
+
+# Input system tests
+def test_input_commands_and_key_state():
+    pygame.display.init()
+    input = InputSystem()
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_w))
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_LEFT))
+    pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_w))
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_z))
+    input.poll()
+    assert [command for _, command in input.take()] == ["up", "left"]
+    assert input.take() == ()
+    assert input.held("left") and not input.held("up")
+
+def test_input_blocks_unused_events():
+    pygame.display.init()
+    InputSystem().setup()
+    assert pygame.event.get_blocked(pygame.MOUSEMOTION)
+    assert not pygame.event.get_blocked(pygame.KEYDOWN)
+    assert not pygame.event.get_blocked(pygame.VIDEOEXPOSE)
+    pygame.event.set_allowed(None)
+
+# An exposed window gets the whole scene drawn again, even on a static screen
+def test_expose_redraws_scene():
+    scene_manager = SceneManager()
+    start_scene = StartScene(scene_manager, pygame.Surface((1280, 720)), {})
+    start_scene.renderer.full_redraw = False
+    pygame.display.init()
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.VIDEOEXPOSE))
+    scene_manager.input.poll()
+    start_scene.poll_events()
+    assert start_scene.renderer.full_redraw
+
+def test_latest_direction_wins():
+    main_scene = make_main_scene()
+    main_scene.handle_command("up", time.perf_counter())
+    main_scene.handle_command("left", time.perf_counter())
+    main_scene.step(MainScene.step_time)
+    assert main_scene.player.direction == "left"
+    assert main_scene.recording.presses() == [(0, "left")]
+    assert main_scene.manager.input.latency()["commands"] == 1
+
+
+# Start scene class test
+def test_start_scene_init():
+    scene_manager = SceneManager()
+    start_scene = StartScene(scene_manager, pygame.Surface((800, 600)), {})
+    assert start_scene.manager == scene_manager
+
+
+def test_start_scene_waits_for_assets():
+    pygame.display.init()
+    scene_manager = SceneManager()
+    start_scene = StartScene(scene_manager, pygame.Surface((800, 600)), {})
+    scene_manager.initialize({"start": start_scene}, "start")
+
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    scene_manager.input.poll()
+    start_scene.poll_events()
+    assert scene_manager.get_scene() is start_scene
+    assert not start_scene.is_idle()
+
+
+# Death scene class test
+def test_death_scene_initialization():
+    scene_manager = SceneManager()
+    death_scene = DeathScene(scene_manager, pygame.Surface((800, 600)), {})
+    assert death_scene.manager == scene_manager
+    assert death_scene.manager.get_score().score == 0
+
+
+# The stinger is resolved with the other sounds, dying only plays it
+def test_death_sound_resolved_before_dying(monkeypatch):
+    game = Game(headless=True)
+    assert game.scenes["death"].death_sound is not None
+
+    def fail(*args):
+        raise AssertionError("sound decoded on death")
+    monkeypatch.setattr("project._sounds", {})
+    monkeypatch.setattr(pygame.mixer, "Sound", fail)
+    game.scene_manager.set_scene("death")
+
+
+# Score class test
+def test_score_initialization():
+    score = Score(600, 80)
+    assert score.score == 0
+
+def test_add_score():
+    score = Score(600, 80)
+    score.add_score()
+    assert score.score == 1
+
+def test_update_score():
+    score = Score(600, 80)
+    score.score = 10
+    score.update()
+    assert score.text == "10"
+
+def test_score_composed_only_when_changed():
+    score = Score(600, 80)
+    surface = score.surface
+    score.update()
+    assert score.surface is surface
+    score.add_score()
+    score.update()
+    assert score.surface is not surface
+
+def test_glyph_atlas_matches_font():
+    atlas = get_atlas(FONT_NAME, 40, "white")
+    assert get_atlas(FONT_NAME, 40, "white") is atlas
+    width, _ = get_font(FONT_NAME, 40).size("Highscore: 1234567890")
+    assert abs(atlas.compose("Highscore: 1234567890").get_width() - width) <= 2
+    # Characters outside the charset still show up, straight from the font
+    assert atlas.compose("#1").get_width() == get_font(FONT_NAME, 40).size("#1")[0]
+
+
+# Text cache tests
+def test_font_registry():
+    assert get_font("Arial Black", 36) is get_font("Arial Black", 36)
+
+def test_text_surface_cached():
+    text = Text(80, 30, "Penta Kill!")
+    surface = text.surface
+    text.text = "Penta Kill!"
+    assert text.surface is surface
+    text.text = "Killing Frenzy!"
+    assert text.surface is not surface
+
+
+# Asset pipeline tests
+def test_has_alpha():
+    sprite = pygame.Surface((10, 10), pygame.SRCALPHA)
+    assert has_alpha(sprite)
+    sprite.fill((255, 0, 0, 255))
+    assert not has_alpha(sprite)
+    assert not has_alpha(pygame.Surface((10, 10)))
+
+def test_load_image_uses_disk_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "sprite.png")
+    pygame.image.save(pygame.Surface((40, 40), pygame.SRCALPHA), path)
+    cache_dir = str(tmp_path / "cache")
+
+    sprite = load_image(path, (20, 20), cache_dir)
+    assert sprite.get_size() == (20, 20)
+    assert len(os.listdir(cache_dir)) == 1
+
+    def fail(*args):
+        raise AssertionError("image decoded again")
+    monkeypatch.setattr(pygame.image, "load", fail)
+    cached = load_image(path, (20, 20), cache_dir)
+    assert cached.get_size() == (20, 20)
+    assert has_alpha(cached)
+
+
+def test_asset_loader(tmp_path):
+    path = str(tmp_path / "sprite.png")
+    pygame.image.save(pygame.Surface((40, 40)), path)
+    loader = AssetLoader({"sprite": (path, (20, 20))}, {})
+    loader.start()
+    sprites = loader.finish()
+    assert loader.done and loader.progress == 1.0
+    assert sprites["sprite"].get_size() == (20, 20)
+
+# The worker leaves the mixer to the main thread and only decodes sounds once it is up
+def test_asset_loader_waits_for_mixer(tmp_path):
+    path = str(tmp_path / "sound.wav")
+    with wave.open(path, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(22050)
+        file.writeframes(bytes(2205 * 2))
+    pygame.mixer.quit()
+    loader = AssetLoader({}, {"sound": (path, 0.5)})
+    loader.start()
+    loader.thread.join(0.2)
+    assert not loader.done and not pygame.mixer.get_init()
+    loader.start_mixer()
+    loader.finish()
+    assert pygame.mixer.get_init() and loader.progress == 1.0
+
+
+# Dirty rect renderer tests
+def test_dirty_renderer_pushes_only_changes():
+    screen = pygame.display.set_mode((200, 200))
+    renderer = DirtyRenderer(screen)
+    background = pygame.Surface((200, 200))
+    sprite = pygame.Surface((10, 10))
+
+    assert renderer.draw(background, [("sprite", sprite, (20, 20))]) == [screen.get_rect()]
+    assert renderer.draw(background, [("sprite", sprite, (20, 20))]) == []
+    assert renderer.draw(background, [("sprite", sprite, (40, 20))]) == [pygame.Rect(20, 20, 10, 10), pygame.Rect(40, 20, 10, 10)]
+
+    renderer.invalidate()
+    assert renderer.draw(background, [("sprite", sprite, (40, 20))]) == [screen.get_rect()]
+
+
+def test_dirty_renderer_scales_to_window():
+    window = pygame.Surface((2560, 1440))
+    renderer = DirtyRenderer(window, Viewport(window))
+    background = pygame.Surface((1280, 720))
+    background.fill("red")
+    sprite = pygame.Surface((10, 10))
+    sprite.fill("blue")
+
+    renderer.draw(background, [("sprite", sprite, (20, 20))])
+    assert window.get_at((45, 45)) == pygame.Color("blue") and window.get_at((60, 60)) == pygame.Color("red")
+    assert renderer.draw(background, [("sprite", sprite, (40, 20))]) == [pygame.Rect(40, 40, 20, 20), pygame.Rect(80, 40, 20, 20)]
+    assert window.get_at((45, 45)) == pygame.Color("red")
+
+
+# Viewport tests
+def test_viewport_letterboxes():
+    viewport = Viewport(pygame.Surface((1920, 1200)))
+    assert viewport.scale == 1.5 and not viewport.integer
+    assert viewport.offset == (0, 60)
+    assert viewport.map(pygame.Rect(10, 10, 80, 80)) == pygame.Rect(15, 75, 120, 120)
+
+def test_viewport_caches_scaled_surfaces():
+    viewport = Viewport(pygame.Surface((3840, 2160)))
+    assert viewport.integer and viewport.scale == 3
+    sprite = pygame.Surface((80, 80))
+    assert viewport.scaled(sprite) is viewport.scaled(sprite)
+    assert viewport.scaled(sprite).get_size() == (240, 240)
+
+    viewport.resize(pygame.Surface((1280, 720)))
+    assert viewport.identity and viewport.scaled(sprite) is sprite
+
+
+# Frame pacer tests
+def test_pacer_holds_target_fps():
+    pacer = FramePacer(target_fps=200)
+    pacer.tick()
+    start = pacer.frame_start
+    for _ in range(5):
+        pacer.tick()
+    assert time.perf_counter() - start >= 5 / 200
+
+def test_pacer_idle_budget():
+    pacer = FramePacer(target_fps=200, idle_fps=50)
+    pacer.tick(idle=True)
+    assert pacer.frame_time >= 1 / 50
+    assert pacer.report()["budget_ms"] == pytest.approx(20)
@@ -0,0 +1,28 @@
+import os
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import numpy as np
+from rollout import rollout, summarize
+
+
+# Every game's result only depends on the seed, not on how the work was split up
+def test_rollout_is_deterministic():
+    scores, steps, timing = rollout(48, "random", workers=1, seed=3, chunk_size=16, max_steps=600)
+    pooled_scores, pooled_steps, _ = rollout(48, "random", workers=2, seed=3, chunk_size=16, max_steps=600)
+    assert (scores == pooled_scores).all() and (steps == pooled_steps).all()
+    assert 0 < steps.max() <= 600
+    assert timing["steps"] > 0
+
+    other_scores, other_steps, _ = rollout(48, "random", workers=1, seed=4, chunk_size=16, max_steps=600)
+    assert (steps != other_steps).any()
+
+
+def test_summarize_milestones():
+    stats = summarize(np.array([0, 5, 12, 30]), np.array([120, 240, 360, 480]))
+    assert stats["score_max"] == 30
+    assert stats["survived_mean_s"] == 2.5
+    assert stats["milestones"][5] == 0.75
+    assert stats["milestones"][15] == 0.25
+    assert stats["milestones"][100] == 0.0